@@ -1,16 +1,15 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from tensorflow.keras.models import load_model
-import joblib
-import os
-import pickle
-from utils import fetch_weather_data
-
-# Set random seed for reproducibility
+from utils import fetch_weather_arrays, fetch_weather_bulk
+from forecast_cache import ForecastCache
+from forecast_store import ForecastStore
+from window_buffer import IncrementalFetcher
+from model_registry import configure_threads, get_registry, model_version
+import metrics
+
+# Set random seed for reproducibility (TensorFlow is seeded when the
+# registry first imports it, so engines that don't need it never load it)
 np.random.seed(42)
-import tensorflow as tf
-tf.random.set_seed(42)
 
 # City name to code and coordinates mapping
 city_details = {
@@ -21,85 +20,245 @@ city_details = {
     "Hyderabad": (4, 17.3850, 78.4867)
 }
 
+# Model input/output columns and condition labels
+FEATURE_COLUMNS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m', 'city']
+TARGET_COLUMNS = FEATURE_COLUMNS[:4]
+LABEL_MAP = {0: "Sunny", 1: "Cloudy", 2: "Rainy"}
+
 # Cache settings
-CACHE_FILE = 'weather_cache.pkl'
+CACHE_DIR = 'weather_cache'
 CACHE_LIFETIME = 3600  # Cache data for 1 hour (3600 seconds)
+CACHE_MAX_ENTRIES = 128  # In-memory LRU entries
+CACHE_MAX_DISK_ENTRIES = 1024  # Pickle files kept in CACHE_DIR
+
+# Keyed by (lat, lon, forecast hour, engine, model version); holds the raw
+# window and model outputs
+forecast_cache = ForecastCache(CACHE_DIR, ttl=CACHE_LIFETIME, max_entries=CACHE_MAX_ENTRIES,
+                               max_disk_entries=CACHE_MAX_DISK_ENTRIES, version=model_version)
+
+# Versioned per-city forecast files read by the dashboard
+STORE_DIR = 'forecast_store'
+forecast_store = ForecastStore(STORE_DIR)
+
+# Last input window per city for incremental (hourly) refreshes
+WINDOW_STATE_DIR = 'window_state'
+incremental_fetcher = IncrementalFetcher(WINDOW_STATE_DIR)
+
+def _predict_models(X, codes, registry):
+    # Scalers are precompiled AffineScalers applied to the whole batch. Both
+    # models' scaled inputs share one buffer (model 1 is done with it before
+    # model 2's input overwrites it) and the inverse runs in place
+    condition = registry.get("condition")
+    features = registry.get("features")
+
+    # ==== Model 1 - Predict Weather Conditions ====
+    scaled = condition.scaler.transform(X)
+    y_pred_proba = condition.model.predict(scaled, verbose=0)
+
+    # ==== Model 2 - Predict Features ====
+    predicted = features.model.predict(features.scaler.transform(X, out=scaled), verbose=0)
+
+    # Undo model 2's scaling on the 4 target columns
+    predicted_original = features.scaler.inverse_transform(predicted, out=predicted)
+    return y_pred_proba, predicted_original
+
+def _predict_keras(X, codes):
+    return _predict_models(X, codes, get_registry("keras"))
+
+def _predict_numpy(X, codes):
+    return _predict_models(X, codes, get_registry("numpy"))
+
+def _predict_compiled(backend):
+    # XLA / TFLite variants from compiled_models.py behind the same registry
+    return lambda X, codes: _predict_models(X, codes, get_registry(backend))
+
+def _predict_fused(X, codes):
+    from fused_inference import get_fused_forecaster
+    return get_fused_forecaster()(X)
+
+# Inference engines selectable from run_forecast / run_forecast_batch
+ENGINES = {
+    "keras": _predict_keras,
+    "fused": _predict_fused,
+    "numpy": _predict_numpy,
+    "xla": _predict_compiled("xla"),
+    "tflite_fp16": _predict_compiled("tflite_fp16"),
+    "tflite_int8": _predict_compiled("tflite_int8"),
+}
 
-def load_cached_weather_data():
-    # Check if cache file exists
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'rb') as f:
-            cached_data = pickle.load(f)
-        
-        # Check if cache is still valid (not expired)
-        if time.time() - cached_data['timestamp'] < CACHE_LIFETIME:
-            return cached_data['weather_data']
-
-    # If no valid cache, fetch fresh data
+def _stack_windows(values, codes):
+    # Stack (120, 4) windows into one (N, 120, 5) model input, city code last
+    X = np.empty((len(values), 120, 5), dtype=np.float32)
+    for i, window in enumerate(values):
+        X[i, :, :4] = window
+    X[:, :, 4] = np.asarray(codes)[:, None]
+    return X
+
+def _result_frames(times, y_pred_proba, predicted_original):
+    # Model outputs for one window -> the conditions and features DataFrames
+    times = pd.DatetimeIndex(times)
+    condition_df = pd.DataFrame({
+        'time': times,
+        'Predicted_Weather': [LABEL_MAP[c] for c in np.argmax(y_pred_proba, axis=-1)],
+    })
+
+    pred_df = pd.DataFrame(predicted_original, columns=TARGET_COLUMNS)
+    pred_df['time'] = pd.date_range(start=times[0], periods=120, freq='h')
+    return {'conditions': condition_df, 'features': pred_df}
+
+def predict_batch(windows, codes, engine="keras"):
+    # windows is a list of (times, values) pairs and codes the city code fed
+    # to the models for each; returns one result dict per window
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine: {engine}")
+
+    codes = np.asarray(codes, dtype=float)
+    X = _stack_windows([values for _, values in windows], codes)
+    with metrics.timer("inference", engine=engine):
+        y_pred_proba, predicted_original = ENGINES[engine](X, codes)
+    return [
+        _result_frames(times, y_pred_proba[i], predicted_original[i])
+        for i, (times, _) in enumerate(windows)
+    ]
+
+def predict_windows(windows, engine="keras"):
+    # windows maps city name -> (times, values) with values a (120, 4) array
+    # in TARGET_COLUMNS order; every city goes through each model in one
+    # batched call
+    names = list(windows)
+    codes = [city_details[name][0] for name in names]
+    results = predict_batch([windows[name] for name in names], codes, engine=engine)
+    return dict(zip(names, results))
+
+def predict_frames(frames, engine="keras"):
+    # frames maps city name -> 120-row weather DataFrame
+    windows = {name: (df['time'].to_numpy(), df[TARGET_COLUMNS].to_numpy(dtype=float)) for name, df in frames.items()}
+    return predict_windows(windows, engine=engine)
+
+def publish_result(city_name, result, fresh):
+    # Publish a new version unless this forecast is already in the store
+    if fresh or forecast_store.latest_version(city_name) is None:
+        with metrics.timer("store_write", city=city_name):
+            return forecast_store.save_frames(city_name, result['conditions'], result['features'])
     return None
 
-def save_weather_data_to_cache(weather_data):
-    cached_data = {'weather_data': weather_data, 'timestamp': time.time()}
-    with open(CACHE_FILE, 'wb') as f:
-        pickle.dump(cached_data, f)
+def run_forecast_batch(cities=None, engine="keras"):
+    cities = list(city_details) if cities is None else list(cities)
+    for city_name in cities:
+        if city_name not in city_details:
+            raise ValueError(f"City not supported: {city_name}")
+
+    # Cities forecast earlier this hour skip both the fetch and inference
+    results, keys, missing = {}, {}, []
+    for city_name in cities:
+        _, lat, lon = city_details[city_name]
+        keys[city_name] = forecast_cache.key(lat, lon, engine=engine)
+        cached = forecast_cache.get(keys[city_name])
+        if cached is not None:
+            results[city_name] = cached['result']
+        else:
+            missing.append(city_name)
 
-def run_forecast(city_name="Chennai"):
+    if missing:
+        # One bulk Open-Meteo request for every city not in the cache
+        with metrics.timer("fetch_bulk"):
+            fetched = fetch_weather_bulk([city_details[name][1:] for name in missing])
+        windows = dict(zip(missing, fetched))
+        fresh = predict_windows(windows, engine=engine)
+        for city_name, result in fresh.items():
+            forecast_cache.put(keys[city_name], {'weather_data': windows[city_name], 'result': result})
+        results.update(fresh)
+
+    for city_name in cities:
+        publish_result(city_name, results[city_name], city_name in missing)
+    return {city_name: results[city_name] for city_name in cities}
+
+def run_forecast(city_name="Chennai", engine="keras"):
     if city_name not in city_details:
         raise ValueError("City not supported.")
 
     city_code, lat, lon = city_details[city_name]
+    key = forecast_cache.key(lat, lon, engine=engine)
 
-    # ==== Load models ====
-    model1 = load_model("model_1_180_rain.h5")
-    scaler1 = joblib.load("model_1_180_rain.pkl")
-
-    model2 = load_model("model_2_temp_hum_press.h5")
-    scaler2 = joblib.load("model_2_scaler.pkl")
-
-    # ==== Try to load cached weather data ====
-    cached_weather = load_cached_weather_data()
+    with metrics.timer("run_forecast", city=city_name):
+        # ==== Try to load cached weather data and forecast ====
+        with metrics.timer("cache_lookup", city=city_name):
+            cached = forecast_cache.get(key)
 
-    if cached_weather is None:
-        # Fetch latest weather data if no valid cache
-        print("Fetching fresh weather data...")
-        df = fetch_weather_data(lat, lon)
-        # Save fetched data to cache for future use
-        save_weather_data_to_cache(df)
-    else:
-        print("Using cached weather data...")
-        # Use cached data
-        df = cached_weather
+        if cached is None:
+            # Fetch latest weather data if no valid cache
+            print("Fetching fresh weather data...")
+            with metrics.timer("fetch", city=city_name):
+                window = fetch_weather_arrays(lat, lon)
+            with metrics.timer("predict", city=city_name, engine=engine):
+                result = predict_windows({city_name: window}, engine=engine)[city_name]
+            # Save fetched data and model outputs to cache for future use
+            with metrics.timer("cache_write", city=city_name):
+                forecast_cache.put(key, {'weather_data': window, 'result': result})
+        else:
+            print("Using cached forecast...")
+            result = cached['result']
 
-    df['city'] = city_code
+        publish_result(city_name, result, cached is None)
+    return result
 
-    # ==== Model 1 - Predict Weather Conditions ====
-    X1 = df[['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m', 'city']]
-    X1_scaled = scaler1.transform(X1)
-    X1_input = X1_scaled.reshape(1, 120, 5)
+def run_forecast_incremental(cities=None, engine="keras"):
+    # Hourly refresh path: fetch only the hours that appeared since the last
+    # run and rerun inference only for cities whose input window changed
+    cities = list(city_details) if cities is None else list(cities)
+    for city_name in cities:
+        if city_name not in city_details:
+            raise ValueError(f"City not supported: {city_name}")
 
-    y_pred_proba = model1.predict(X1_input)
-    y_classes = np.argmax(y_pred_proba, axis=-1)[0]
-    label_map = {0: "Sunny", 1: "Cloudy", 2: "Rainy"}
-    predicted_labels = [label_map[i] for i in y_classes]
+    windows = {}
+    for city_name in cities:
+        _, lat, lon = city_details[city_name]
+        with metrics.timer("fetch", city=city_name):
+            times, values, changed = incremental_fetcher.refresh(city_name, lat, lon)
+        if changed or forecast_store.latest_version(city_name) is None:
+            windows[city_name] = (times, values)
 
-    df['Predicted_Weather'] = predicted_labels
-    df[['time', 'Predicted_Weather']].to_csv("forecast_weather_condition.csv", index=False)
+    if not windows:
+        print("Input windows unchanged, skipping inference.")
+        return {}
 
-    # ==== Model 2 - Predict Features ====
-    X2 = df[['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m', 'city']]
-    X2_scaled = scaler2.transform(X2)
-    X2_input = X2_scaled.reshape(1, 120, 5)
+    results = predict_windows(windows, engine=engine)
+    for city_name, result in results.items():
+        with metrics.timer("store_write", city=city_name):
+            result['version'] = forecast_store.save_frames(city_name, result['conditions'], result['features'])
+    return results
 
-    predicted_scaled = model2.predict(X2_input)[0]
+if __name__ == "__main__":
+    import argparse
 
-    # Add city column back before inverse transform
-    dummy_city = np.full((120, 1), city_code)
-    predicted_full = np.concatenate((predicted_scaled, dummy_city), axis=1)
+    parser = argparse.ArgumentParser(description="Run the 5-day weather forecast.")
+    parser.add_argument("cities", nargs="*", help="Cities to forecast (default: all)")
+    parser.add_argument("--engine", default="keras", choices=sorted(ENGINES))
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fetch only new hours since the last run (for hourly cron jobs)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a long-lived scheduler that refreshes the store on a fixed cadence")
+    parser.add_argument("--interval", type=int, default=3600, help="Scheduler cadence in seconds")
+    parser.add_argument("--workers", type=int, default=2, help="Scheduler worker pool size")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Enable instrumentation and serve /metrics (Prometheus) and /metrics.json on this port")
+    parser.add_argument("--intra-op-threads", type=int, help="TensorFlow intra-op / TFLite interpreter threads")
+    parser.add_argument("--inter-op-threads", type=int, help="TensorFlow inter-op threads")
+    args = parser.parse_args()
 
-    predicted_original = scaler2.inverse_transform(predicted_full)[:, :4]
-    future_times = pd.date_range(start=df['time'].iloc[0], periods=120, freq='H')
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
 
-    pred_df = pd.DataFrame(predicted_original, columns=['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m'])
-    pred_df['time'] = future_times
-    pred_df.to_csv("forecast_weather_features.csv", index=False)
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
 
+    cities = args.cities or list(city_details)
+    if args.serve:
+        from forecast_scheduler import serve
+        serve(cities, interval=args.interval, workers=args.workers, engine=args.engine,
+              incremental=args.incremental)
+    elif args.incremental:
+        updated = run_forecast_incremental(cities, engine=args.engine)
+        print(f"Updated {len(updated)} of {len(cities)} cities: {incremental_fetcher.counters}")
+    else:
+        for city_name in cities:
+            run_forecast(city_name, engine=args.engine)
@@ -0,0 +1,219 @@
+# backfill.py
+#
+# Historical backfill and forecast-skill evaluation. Archived hourly data
+# (the hourly_weather_data_labeled.csv schema) is streamed in chunks, cut
+# into (120 h input, 120 h truth) windows per city and pushed through both
+# models in large batches on a process pool. Workers return only metric
+# accumulators and at most 2 batches per worker are in flight, so memory
+# stays bounded however long the archive is.
+#
+#   python backfill.py --data hourly_weather_data_labeled.csv --start 2024-01-01 --stride 24
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from forecast_store import CONDITION_LABELS as LABELS
+from training import FEATURES, HORIZON, TARGETS, WINDOW, label_weather, window_view
+
+SPAN = WINDOW + HORIZON
+
+CHUNK_ROWS = 200_000  # CSV rows read at a time
+BATCH_SIZE = 512  # windows per model call
+
+
+class SkillAccumulator:
+    # Running sums for condition accuracy / confusion and feature MAE per
+    # horizon hour; accumulators from different workers add up with merge()
+    def __init__(self):
+        self.windows = 0
+        self.confusion = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)  # [truth, predicted]
+        self.correct_by_hour = np.zeros(HORIZON, dtype=np.int64)
+        self.abs_error = np.zeros((HORIZON, len(TARGETS)))
+
+    def update(self, proba, features, true_labels, true_features):
+        predicted = proba.argmax(axis=-1)
+        self.windows += len(predicted)
+        np.add.at(self.confusion, (true_labels.ravel(), predicted.ravel()), 1)
+        self.correct_by_hour += (predicted == true_labels).sum(axis=0)
+        self.abs_error += np.abs(features - true_features).sum(axis=0)
+
+    def merge(self, other):
+        self.windows += other.windows
+        self.confusion += other.confusion
+        self.correct_by_hour += other.correct_by_hour
+        self.abs_error += other.abs_error
+        return self
+
+    def summary(self):
+        n = max(self.windows, 1)
+        confusion = self.confusion
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.diag(confusion) / confusion.sum(axis=0)
+            recall = np.diag(confusion) / confusion.sum(axis=1)
+        mae_by_hour = self.abs_error / n
+        return {
+            'windows': self.windows,
+            'condition': {
+                'accuracy': float(np.trace(confusion) / max(confusion.sum(), 1)),
+                'accuracy_by_hour': (self.correct_by_hour / n).round(4).tolist(),
+                'confusion': {'labels': list(LABELS), 'rows_true_cols_predicted': confusion.tolist()},
+                'precision': dict(zip(LABELS, np.nan_to_num(precision).round(4).tolist())),
+                'recall': dict(zip(LABELS, np.nan_to_num(recall).round(4).tolist())),
+            },
+            'features': {
+                'mae': dict(zip(TARGETS, mae_by_hour.mean(axis=0).round(4).tolist())),
+                'mae_by_hour': {name: mae_by_hour[:, j].round(4).tolist() for j, name in enumerate(TARGETS)},
+            },
+        }
+
+
+def iter_windows(path, stride=24, start=None, end=None, chunk_rows=CHUNK_ROWS, batch_size=BATCH_SIZE):
+    # Yields (X (B, 120, 5), true_features (B, 120, 4), true_labels (B, 120))
+    # batches. Each city keeps its last SPAN - 1 rows between chunks so
+    # windows crossing a chunk boundary are not lost. Forecast start hours
+    # are aligned to `stride` (24 = one run per day at 00:00 UTC) and windows
+    # spanning gaps in the archive are skipped. Rows must be in time order
+    # within each city.
+    start_hour = None if start is None else pd.Timestamp(start).to_datetime64().astype('datetime64[h]').astype(np.int64)
+    end_hour = None if end is None else pd.Timestamp(end).to_datetime64().astype('datetime64[h]').astype(np.int64)
+    carry = {}
+
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        chunk = chunk.dropna(subset=FEATURES)
+        hours_all = pd.to_datetime(chunk['time']).to_numpy().astype('datetime64[h]').astype(np.int64)
+        labels_all = label_weather(chunk['weathercode'].to_numpy())
+        values_all = chunk[FEATURES].to_numpy(dtype=np.float32)
+
+        for city in np.unique(values_all[:, 4]):
+            mask = values_all[:, 4] == city
+            hours, values, labels = hours_all[mask], values_all[mask], labels_all[mask]
+            if city in carry:
+                prev_hours, prev_values, prev_labels = carry[city]
+                hours = np.concatenate([prev_hours, hours])
+                values = np.concatenate([prev_values, values])
+                labels = np.concatenate([prev_labels, labels])
+            carry[city] = (hours[-(SPAN - 1):], values[-(SPAN - 1):], labels[-(SPAN - 1):])
+            if len(hours) < SPAN:
+                continue
+
+            starts = np.arange(len(hours) - SPAN + 1)
+            first = hours[starts + WINDOW]  # first forecast hour
+            keep = (hours[starts + SPAN - 1] - hours[starts] == SPAN - 1) & (first % stride == 0)
+            if start_hour is not None:
+                keep &= first >= start_hour
+            if end_hour is not None:
+                keep &= first <= end_hour
+            starts = starts[keep]
+
+            # Strided views over the city's rows; only the selected windows
+            # are copied, one batch at a time
+            inputs = window_view(values, WINDOW)
+            truth = window_view(values[:, :4], HORIZON)
+            truth_labels = np.lib.stride_tricks.sliding_window_view(labels, HORIZON)
+            for i in range(0, len(starts), batch_size):
+                s = starts[i:i + batch_size]
+                yield inputs[s], truth[s + WINDOW], truth_labels[s + WINDOW]
+
+
+_engine = None
+
+
+def _init_worker(engine):
+    # One BLAS thread per worker process; the pool already uses every core
+    global _engine
+    _engine = engine
+    try:
+        from threadpoolctl import threadpool_limits  # installed with scikit-learn
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def evaluate_batch(X, true_features, true_labels, engine=None):
+    # Runs one batch through both models and returns its accumulator
+    import automate_forecast
+    engine = engine or _engine
+    proba, features = automate_forecast.ENGINES[engine](X, X[:, 0, 4])
+    acc = SkillAccumulator()
+    acc.update(proba, features, true_labels, true_features)
+    return acc
+
+
+def run_backfill(path, engine="numpy", workers=None, stride=24, start=None, end=None,
+                 chunk_rows=CHUNK_ROWS, batch_size=BATCH_SIZE, progress_every=10):
+    workers = workers or os.cpu_count() or 1
+    batches = iter_windows(path, stride, start, end, chunk_rows, batch_size)
+    total = SkillAccumulator()
+    started = time.perf_counter()
+    done = 0
+
+    def report(acc):
+        nonlocal done
+        total.merge(acc)
+        done += 1
+        if progress_every and done % progress_every == 0:
+            rate = total.windows / (time.perf_counter() - started)
+            print(f"{total.windows:,} windows, {rate:,.0f} windows/sec")
+
+    if workers == 1:
+        for batch in batches:
+            report(evaluate_batch(*batch, engine=engine))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine,)) as pool:
+            pending = set()
+            for batch in batches:
+                # Bound the number of batches held in memory
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future.result())
+                pending.add(pool.submit(evaluate_batch, *batch))
+            for future in pending:
+                report(future.result())
+
+    elapsed = time.perf_counter() - started
+    summary = total.summary()
+    summary['run'] = {
+        'engine': engine,
+        'workers': workers,
+        'stride_h': stride,
+        'start': start,
+        'end': end,
+        'elapsed_s': round(elapsed, 2),
+        'windows_per_sec': round(total.windows / elapsed, 1) if elapsed else None,
+    }
+    return summary
+
+
+if __name__ == "__main__":
+    import automate_forecast
+
+    parser = argparse.ArgumentParser(description="Backfill forecasts over archived data and score them.")
+    parser.add_argument("--data", default="hourly_weather_data_labeled.csv",
+                        help="Hourly CSV with the columns of hourly_weather_data_labeled.csv")
+    parser.add_argument("--engine", default="numpy", choices=sorted(automate_forecast.ENGINES))
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--stride", type=int, default=24, help="Hours between forecast runs")
+    parser.add_argument("--start", help="First forecast start time, e.g. 2024-01-01")
+    parser.add_argument("--end", help="Last forecast start time")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    report = run_backfill(args.data, args.engine, args.workers, args.stride, args.start, args.end,
+                          args.chunk_rows, args.batch_size)
+    condition, features, run = report['condition'], report['features'], report['run']
+    print(f"{report['windows']:,} windows in {run['elapsed_s']}s ({run['windows_per_sec']:,} windows/sec)")
+    print(f"Condition accuracy: {condition['accuracy']:.3f}")
+    print("Feature MAE: " + ", ".join(f"{k} {v:.3f}" for k, v in features['mae'].items()))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Report written to {args.output}")
@@ -0,0 +1,126 @@
+# benchmarks/completion_stub.py
+#
+# Local stand-in for the OpenRouter chat completions endpoint, so the chatbot
+# can be exercised without an API key or network access. It answers every
+# request with a canned reply mentioning the prompt, either as one JSON body
+# or, with "stream": true, as server-sent events split into a few chunks
+# (with an OpenRouter-style keep-alive comment first). Requests are counted,
+# so callers can check what the response cache saved.
+#
+#   python -m benchmarks.completion_stub            # serve until interrupted
+#   python -m benchmarks.completion_stub --check    # stream/cache self-check
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Stub forecast answer to: {prompt}"
+CHUNK_WORDS = 3
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            with stub.lock:
+                stub.requests += 1
+            content = payload['messages'][-1]['content']
+            reply = REPLY.format(prompt=content.split('\n')[-1].strip())
+            if payload.get('stream'):
+                self._stream(reply)
+            else:
+                self._send(200, 'application/json', json.dumps({
+                    'choices': [{'message': {'role': 'assistant', 'content': reply}}],
+                }).encode())
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, reply):
+            words = reply.split(' ')
+            events = [": OPENROUTER PROCESSING\n\n"]
+            for i in range(0, len(words), CHUNK_WORDS):
+                text = ' '.join(words[i:i + CHUNK_WORDS]) + (' ' if i + CHUNK_WORDS < len(words) else '')
+                events.append(f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n")
+            events.append("data: [DONE]\n\n")
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for event in events:
+                data = event.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+                time.sleep(stub.chunk_delay)
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class CompletionStub:
+    # Context manager running the stub on a free localhost port
+    def __init__(self, chunk_delay=0.01):
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(self))
+        self.thread = threading.Thread(target=self.server.serve_forever, name="completion-stub", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/api/v1/chat/completions"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check():
+    # Streams the same prompt twice for one forecast snapshot (the second
+    # with a different clock in the context) and checks the second answer
+    # came from the cache without a request
+    import chatbot
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+    with CompletionStub() as stub:
+        chatbot.OPENROUTER_URL = stub.url
+        snapshot = ("Chennai", "20260101T000000000000000", "2026-01-01 09:00:00")
+        start = time.perf_counter()
+        chunks = list(chatbot.stream_ai_response("Will it rain today?", "Time: 09:01 AM", snapshot))
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        cached = list(chatbot.stream_ai_response("Will it rain today?", "Time: 09:02 AM", snapshot))
+        second = time.perf_counter() - start
+        ok = len(chunks) > 1 and cached == ["".join(chunks)] and stub.requests == 1
+        print(f"streamed {len(chunks)} chunks in {first * 1000:.1f} ms, cached answer in {second * 1000:.2f} ms, "
+              f"{stub.requests} request(s): {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake chat completion server.")
+    parser.add_argument("--check", action="store_true", help="Run the chatbot streaming/cache self-check")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+    with CompletionStub() as stub:
+        print(f"Completion stub listening on {stub.url} (set OPENROUTER_URL to use it)")
+        stub.thread.join()
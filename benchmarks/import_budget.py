@@ -0,0 +1,86 @@
+# benchmarks/import_budget.py
+#
+# Cold-start check for the dashboard and forecast processes. Each group of
+# modules is imported in a fresh interpreter; the check fails if a heavy
+# dependency that should load lazily shows up in sys.modules, or if the
+# median import time (minus bare interpreter startup) is over budget.
+#
+#   python -m benchmarks.import_budget            # check
+#   python -m benchmarks.import_budget --measure  # print times only
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (model load, first chart, first chat message), never
+# at import
+LAZY_MODULES = ('tensorflow', 'keras', 'sklearn', 'joblib', 'h5py', 'plotly.express')
+
+# Group name -> (modules imported, budget in seconds). Budgets are ~2x the
+# times measured on a 1-vCPU box, so only real regressions trip them.
+GROUPS = {
+    # Everything app.py imports before the first render, plus the scheduler
+    # it starts in the background
+    'dashboard': (['streamlit', 'pandas', 'pytz', 'chatbot', 'forecast_store', 'view_models',
+                   'figures', 'news_digest', 'forecast_scheduler'], 2.0),
+    'automate_forecast': (['automate_forecast'], 1.0),
+    'chatbot': (['chatbot'], 1.0),
+}
+
+
+def _run(code):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, out.stdout
+
+
+def measure(modules, repeat=5):
+    # Median import time of `modules` in a fresh process, and the lazy
+    # modules it loaded
+    code = (f"import sys, json\nimport {', '.join(modules)}\n"
+            f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+    startup = statistics.median(_run("pass")[0] for _ in range(repeat))
+    timings = []
+    for _ in range(repeat):
+        elapsed, out = _run(code)
+        timings.append(elapsed - startup)
+    return statistics.median(timings), json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold import time against the budget.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--measure", action="store_true", help="Report times without failing")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for name, (modules, budget) in GROUPS.items():
+        try:
+            seconds, loaded = measure(modules, args.repeat)
+        except subprocess.CalledProcessError as e:
+            error = (e.stderr.strip().splitlines() or ['unknown error'])[-1]
+            print(f"{name:<20} import failed: {error}")
+            failures.append(f"{name} fails to import: {error}")
+            continue
+        print(f"{name:<20} {seconds:6.2f}s (budget {budget:.1f}s)"
+              + (f"  eagerly loaded: {', '.join(loaded)}" if loaded else ""))
+        if loaded:
+            failures.append(f"{name} imports {', '.join(loaded)} at import time")
+        if seconds > budget:
+            failures.append(f"{name} takes {seconds:.2f}s to import (budget {budget:.1f}s)")
+
+    if args.measure:
+        return 0
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
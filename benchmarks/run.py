@@ -0,0 +1,309 @@
+# benchmarks/run.py
+#
+# Times each forecast pipeline stage and the dashboard data prep at several
+# location counts, writes the results as JSON and compares them against a
+# stored baseline. CPU-only and offline: weather comes from the local
+# Open-Meteo stub, fixtures from the bundled sample CSVs.
+#
+#   python -m benchmarks.run                        # compare to baseline
+#   python -m benchmarks.run --sizes 1,5 --engines numpy
+#   python -m benchmarks.run --update-baseline      # record a new baseline
+#
+# Exits with status 1 if any stage's best time is slower than the baseline's
+# by more than both --tolerance (relative) and --min-delta (absolute, filters
+# timer and fsync noise on short stages). Baselines are machine specific:
+# re-record one with --update-baseline on the machine that runs the check.
+
+import os
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import automate_forecast
+from forecast_store import ForecastStore
+from model_registry import INPUT_SHAPE, ModelRegistry, get_registry
+from utils import fetch_weather_bulk
+from figures import FigureCache
+from view_models import build_forecast_view
+
+from .stub_server import StubServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.json')
+SAMPLE_CONDITIONS_CSV = os.path.join(ROOT_DIR, 'forecast_weather_condition.csv')
+SAMPLE_FEATURES_CSV = os.path.join(ROOT_DIR, 'forecast_weather_features.csv')
+
+SIZES = (1, 5, 100, 1000)
+ENGINES = ("numpy", "keras", "fused")
+# The dashboard only ever renders a handful of cities per session
+DASHBOARD_MAX_SIZE = 100
+FIGURE_MAX_SIZE = 5  # chart builds take ~50 ms per day, so only small sizes
+
+
+def _coords(n):
+    # n deterministic locations spread around the supported cities
+    base = np.array([details[1:] for details in automate_forecast.city_details.values()])
+    offsets = np.arange(n)[:, None] * 0.01
+    return [tuple(c) for c in (base[np.arange(n) % len(base)] + offsets).round(4)]
+
+
+def _time(fn, repeat):
+    # One untimed call first absorbs one-off costs (e.g. TF retracing for a
+    # new batch size) that a long-running process pays only once
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _cold_load(engine):
+    if engine != "fused":
+        return ModelRegistry(backend=engine).load_all()
+    from fused_inference import FusedForecaster
+    registry = ModelRegistry(backend="keras")
+    fused = FusedForecaster(registry.get("condition"), registry.get("features"))
+    fused(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32))
+
+
+class PipelineBench:
+    # Holds the intermediate outputs of each stage so every stage is timed on
+    # realistic input without re-running the ones before it
+    def __init__(self, stub_url, work_dir, engines, repeat):
+        self.stub_url = stub_url
+        self.work_dir = work_dir
+        self.engines = engines
+        self.repeat = repeat
+        self.results = {}
+
+    def record(self, stage, n, fn):
+        timings = _time(fn, self.repeat)
+        median = statistics.median(timings)
+        self.results.setdefault(stage, {})[str(n)] = {
+            'median_s': median,
+            'min_s': min(timings),
+            'per_location_ms': median / n * 1000,
+        }
+        print(f"  {stage:<24} n={n:<5} {median * 1000:10.2f} ms  ({median / n * 1000:.3f} ms/location)")
+
+    def model_load(self):
+        # Cold load (files, weights, scaler, warm-up) in a fresh registry;
+        # the fused engine is timed as a keras load plus its graph trace
+        for engine in self.engines:
+            self.record(f"model_load_{engine}", 1, lambda: _cold_load(engine))
+            if engine == "fused":
+                from fused_inference import get_fused_forecaster
+                get_fused_forecaster()
+            else:
+                get_registry(engine).load_all()
+
+    def run_size(self, n):
+        coords = _coords(n)
+        codes = (np.arange(n) % len(automate_forecast.city_details)).astype(float)
+
+        self.record("fetch_bulk", n, lambda: fetch_weather_bulk(coords, base_url=self.stub_url))
+        windows = fetch_weather_bulk(coords, base_url=self.stub_url)
+
+        values = [w[1] for w in windows]
+        self.record("stack_windows", n, lambda: automate_forecast._stack_windows(values, codes))
+        X = automate_forecast._stack_windows(values, codes)
+
+        for engine in self.engines:
+            predict = automate_forecast.ENGINES[engine]
+            self.record(f"inference_{engine}", n, lambda: predict(X, codes))
+            if engine != "fused":
+                # The fused engine scales inside its graph, so it has no
+                # separate steps to time
+                self.inference_steps(engine, n, X)
+        proba, features = automate_forecast.ENGINES[self.engines[0]](X, codes)
+
+        def result_frames():
+            return [automate_forecast._result_frames(w[0], proba[i], features[i]) for i, w in enumerate(windows)]
+
+        self.record("result_frames", n, result_frames)
+        frames = result_frames()
+
+        store = ForecastStore(os.path.join(self.work_dir, f"store_{n}"))
+        names = [f"loc{i:04d}" for i in range(n)]
+
+        def store_write():
+            for name, result in zip(names, frames):
+                store.save_frames(name, result['conditions'], result['features'])
+
+        self.record("store_write", n, store_write)
+
+        if n <= DASHBOARD_MAX_SIZE:
+            self.run_dashboard(n, store, names)
+
+    def inference_steps(self, engine, n, X):
+        # The scaler, predict and inverse steps that make up inference_<engine>
+        registry = get_registry(engine)
+        condition, features = registry.get("condition"), registry.get("features")
+
+        def scale():
+            return condition.scaler.transform(X), features.scaler.transform(X)
+
+        self.record(f"scale_{engine}", n, scale)
+        X1, X2 = scale()
+
+        def predict():
+            return condition.model.predict(X1, verbose=0), features.model.predict(X2, verbose=0)
+
+        self.record(f"predict_{engine}", n, predict)
+        _, predicted = predict()
+        self.record(f"inverse_{engine}", n, lambda: features.scaler.inverse_transform(predicted))
+
+    def run_dashboard(self, n, store, names):
+        def csv_read():
+            # Sample CSV path still used by the legacy test.py dashboard
+            for _ in range(n):
+                pred = pd.read_csv(SAMPLE_CONDITIONS_CSV)
+                weather = pd.read_csv(SAMPLE_FEATURES_CSV)
+                pred['time'] = pd.to_datetime(pred['time'])
+                weather['time'] = pd.to_datetime(weather['time'])
+
+        def store_read():
+            for name in names:
+                store.load_frames(name)
+
+        loaded = {name: store.load_frames(name) for name in names}
+
+        def view_build():
+            # Join, per-day split and hourly box HTML for every day
+            for name in names:
+                build_forecast_view(name, None, *loaded[name])
+
+        views = [build_forecast_view(name, 'bench', *loaded[name]) for name in names]
+
+        def figure_build():
+            # Cold chart builds for every day of every view
+            cache = FigureCache()
+            for view in views:
+                for day in view.day_options:
+                    cache.get(view, day)
+
+        self.record("dashboard_csv_read", n, csv_read)
+        self.record("dashboard_store_read", n, store_read)
+        self.record("dashboard_view_build", n, view_build)
+        if n <= FIGURE_MAX_SIZE:
+            self.record("dashboard_figure_build", n, figure_build)
+
+
+def _stage_engine(stage):
+    for engine in automate_forecast.ENGINES:
+        if stage.endswith(f"_{engine}"):
+            return engine
+    return None
+
+
+def compare(results, baseline, tolerance, min_delta, baseline_engines=ENGINES):
+    # Returns (regressions, stage/size pairs with no baseline entry); an
+    # unrecorded stage fails the run rather than going unchecked. Stages of
+    # engines the baseline was not recorded with (e.g. the optional xla or
+    # tflite backends) are only compared when an entry exists.
+    regressions, missing = [], []
+    for stage, sizes in results.items():
+        engine = _stage_engine(stage)
+        for n, current in sizes.items():
+            reference = baseline.get(stage, {}).get(n)
+            if reference is None:
+                if engine is None or engine in baseline_engines:
+                    missing.append((stage, n))
+                continue
+            # Best-of-repeat is the least noisy estimate of a stage's cost
+            delta = current['min_s'] - reference['min_s']
+            if delta > min_delta and current['min_s'] > reference['min_s'] * (1 + tolerance):
+                regressions.append((stage, n, reference['min_s'], current['min_s']))
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the forecast pipeline stages.")
+    parser.add_argument("--sizes", default=','.join(map(str, SIZES)), help="Comma-separated location counts")
+    parser.add_argument("--engines", default=','.join(ENGINES), help="Inference engines to time")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (median is reported)")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed relative slowdown (1.0 = 2x)")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="Ignore slowdowns below this many seconds")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    engines = args.engines.split(',')
+    for engine in engines:
+        if engine not in automate_forecast.ENGINES:
+            parser.error(f"Unknown engine: {engine}")
+
+    work_dir = tempfile.mkdtemp(prefix="forecast-bench-")
+    try:
+        with StubServer() as stub:
+            bench = PipelineBench(stub.url, work_dir, engines, args.repeat)
+            print("Model load")
+            bench.model_load()
+            for n in sizes:
+                print(f"{n} location(s)")
+                bench.run_size(n)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sizes': sizes,
+            'engines': engines,
+            'repeat': args.repeat,
+        },
+        'results': bench.results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions, missing = compare(bench.results, baseline['results'], args.tolerance, args.min_delta,
+                                   baseline['meta'].get('engines', ENGINES))
+    for stage, n, before, after in regressions:
+        print(f"REGRESSION {stage} n={n}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+    for stage, n in missing:
+        print(f"NO BASELINE {stage} n={n}; run with --update-baseline to record it")
+    if regressions or missing:
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
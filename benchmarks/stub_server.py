@@ -0,0 +1,97 @@
+# benchmarks/stub_server.py
+#
+# Local stand-in for the Open-Meteo forecast endpoint, so the benchmarks run
+# without network access. Responses are built from the bundled sample CSVs
+# (Model Training/5_day_weather_*.csv): the 120 sample hours are tiled to the
+# requested range and offset slightly per location. Comma-separated
+# coordinates get a JSON list back, like the real bulk API.
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Model Training')
+FEATURES_CSV = os.path.join(FIXTURE_DIR, '5_day_weather_features.csv')
+CONDITIONS_CSV = os.path.join(FIXTURE_DIR, '5_day_weather_forecast.csv')
+
+FIELDS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m']
+# Representative WMO codes for the sample condition labels
+CONDITION_CODES = {'Sunny': 0, 'Clear': 0, 'Cloudy': 3, 'Rainy': 61}
+
+
+def load_fixture():
+    features = pd.read_csv(FEATURES_CSV)
+    conditions = pd.read_csv(CONDITIONS_CSV)
+    values = features[FIELDS].to_numpy(dtype=float)
+    codes = conditions['Predicted_Weather'].map(CONDITION_CODES).fillna(0).to_numpy(dtype=int)
+    return values, codes
+
+
+def _hours(query):
+    if 'start_hour' in query:
+        return pd.date_range(query['start_hour'][0], query['end_hour'][0], freq='h')
+    # start_date/end_date cover whole days, inclusive
+    start = pd.Timestamp(query['start_date'][0])
+    end = pd.Timestamp(query['end_date'][0]) + pd.Timedelta(hours=23)
+    return pd.date_range(start, end, freq='h')
+
+
+def make_handler(values, codes):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            lats = query['latitude'][0].split(',')
+            lons = query['longitude'][0].split(',')
+            times = _hours(query)
+            rows = np.arange(len(times)) % len(values)
+            stamps = times.strftime('%Y-%m-%dT%H:%M').tolist()
+
+            locations = []
+            for i, (lat, lon) in enumerate(zip(lats, lons)):
+                hourly = {'time': stamps}
+                for j, field in enumerate(FIELDS):
+                    hourly[field] = (values[rows, j] + 0.01 * i).round(3).tolist()
+                hourly['weathercode'] = codes[rows].tolist()
+                locations.append({'latitude': float(lat), 'longitude': float(lon), 'hourly': hourly})
+
+            body = json.dumps(locations if len(locations) > 1 else locations[0]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StubServer:
+    # Context manager running the stub on a free localhost port
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(*load_fixture()))
+        self.thread = threading.Thread(target=self.server.serve_forever, name="open-meteo-stub", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/v1/forecast"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    with StubServer() as stub:
+        print(f"Open-Meteo stub listening on {stub.url} (set OPEN_METEO_URL to use it)")
+        stub.thread.join()
@@ -1,42 +1,97 @@
+import hashlib
+import os
+import threading
+import time
 import requests
 import json
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from forecast_cache import ForecastCache
+import metrics
+
+# Point OPENROUTER_URL at a local fake completion server for testing
+OPENROUTER_URL = os.environ.get("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+MODEL_NAME = "google/gemini-2.0-flash-thinking-exp:free"  # Make sure to use the correct model
+REQUEST_TIMEOUT = (5, 120)  # (connect, read) seconds
+
+# Identical prompt + weather context (or forecast snapshot, when the caller
+# gives one) within the TTL is answered from memory, shared by every session
+# in the server process
+RESPONSE_CACHE_TTL = 900  # 15 minutes
+response_cache = ForecastCache(cache_dir=None, ttl=RESPONSE_CACHE_TTL, max_entries=256, name="chat_response")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled keep-alive session reused across messages
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            _session = session
+        return _session
+
+
+def get_api_key():
+    # Read on the first request rather than at import, so importing this
+    # module (e.g. on every dashboard cold start) never touches secrets.
+    # OPENROUTER_API_KEY in the environment takes precedence over secrets.toml.
+    return os.environ.get("OPENROUTER_API_KEY") or st.secrets["OPENROUTER_API_KEY"]
+
+
+def _cache_key(prompt, weather_context, snapshot=None):
+    # snapshot identifies the forecast the context was rendered from, e.g.
+    # (city, forecast version, hour); it replaces the context in the key so
+    # incidental text such as the clock does not split the cache
+    context = weather_context if snapshot is None else "\0".join(map(str, snapshot))
+    return hashlib.sha256(f"{MODEL_NAME}\0{context}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def _post(prompt, weather_context, stream=False):
+    # Prepare the request payload
+    data_payload = {
+        "model": MODEL_NAME,
+        "messages": [
+            {
+                "role": "user",
+                "content": f"{weather_context} {prompt}"  # Add the weather context to the prompt
+            }
+        ],
+        "stream": stream,
+    }
+
+    # Make the POST request to the API
+    response = get_session().post(
+        url=OPENROUTER_URL,
+        headers={
+            "Authorization": f"Bearer {get_api_key()}",
+            "Content-Type": "application/json",
+            # "HTTP-Referer": "<YOUR_SITE_URL>",  # Optional, can be left blank or replaced with your site URL
+            # "X-Title": "<YOUR_SITE_NAME>",  # Optional, can be left blank or replaced with your site title
+        },
+        data=json.dumps(data_payload),
+        stream=stream,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    response.raise_for_status()  # Raise an error for bad status codes (e.g., 400 or 500)
+    return response
+
+
+def get_ai_response(prompt, weather_context, snapshot=None):
+    key = _cache_key(prompt, weather_context, snapshot)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
 
-# Fetch the API key securely from Streamlit secrets
-OPENROUTER_API_KEY = st.secrets["OPENROUTER_API_KEY"]  # Replace with your actual key in secrets.toml
-
-def get_ai_response(prompt, weather_context):
     try:
-        # Prepare the request payload
-        data_payload = {
-            "model": "google/gemini-2.0-flash-thinking-exp:free",  # Make sure to use the correct model
-            "messages": [
-                {
-                    "role": "user",
-                    "content": f"{weather_context} {prompt}"  # Add the weather context to the prompt
-                }
-            ]
-        }
-
-        # Make the POST request to the API
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                # "HTTP-Referer": "<YOUR_SITE_URL>",  # Optional, can be left blank or replaced with your site URL
-                # "X-Title": "<YOUR_SITE_NAME>",  # Optional, can be left blank or replaced with your site title
-            },
-            data=json.dumps(data_payload)
-        )
-
-        response.raise_for_status()  # Raise an error for bad status codes (e.g., 400 or 500)
-
         # Parse the JSON response
-        response_json = response.json()
-
-        # Print the full response for debugging
-        print("Full Response:", json.dumps(response_json, indent=4))  # This line will print the full response
+        with metrics.timer("chat_request"):
+            response_json = _post(prompt, weather_context).json()
 
         # Check if the response contains valid data
         if "choices" in response_json and len(response_json["choices"]) > 0:
@@ -44,11 +99,15 @@ def get_ai_response(prompt, weather_context):
 
             if content:
                 # Return the AI-generated response
-                return content if isinstance(content, str) else content[0].get("text", "Unknown response format")
+                content = content if isinstance(content, str) else content[0].get("text", "Unknown response format")
+                response_cache.put(key, content)
+                return content
             else:
+                metrics.count("errors_total", stage="chat_request", error="UnexpectedFormat")
                 return "AI response format unexpected."
 
         else:
+            metrics.count("errors_total", stage="chat_request", error="IncompleteResponse")
             return "AI response structure incomplete."
 
     except requests.exceptions.RequestException as e:
@@ -57,7 +116,58 @@ def get_ai_response(prompt, weather_context):
         return f"An error occurred while parsing the API response: {e}"
 
 
-def display_chat_ui():
+def stream_ai_response(prompt, weather_context, snapshot=None):
+    # Yields the response as it arrives over server-sent events, for
+    # st.write_stream. Cached answers are yielded in one piece.
+    key = _cache_key(prompt, weather_context, snapshot)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    start = time.perf_counter()
+    try:
+        # chat_request covers the whole stream, chat_first_token the wait
+        # until the first text arrives
+        with metrics.timer("chat_request", mode="stream"), \
+                _post(prompt, weather_context, stream=True) as response:
+            # SSE is UTF-8; requests would otherwise assume ISO-8859-1 for text/*
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                # Skip keep-alive comments (": OPENROUTER PROCESSING") and blanks
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    metrics.count("errors_total", stage="chat_request", error="StreamError")
+                    yield f"An error occurred during the API request: {chunk['error']}"
+                    return
+                choices = chunk.get("choices") or [{}]
+                text = choices[0].get("delta", {}).get("content")
+                if text:
+                    if not parts:
+                        metrics.observe("chat_first_token", time.perf_counter() - start)
+                    parts.append(text)
+                    yield text
+    except requests.exceptions.RequestException as e:
+        yield f"An error occurred during the API request: {e}"
+        return
+    except (KeyError, json.JSONDecodeError) as e:
+        yield f"An error occurred while parsing the API response: {e}"
+        return
+
+    if parts:
+        response_cache.put(key, "".join(parts))
+    else:
+        metrics.count("errors_total", stage="chat_request", error="IncompleteResponse")
+        yield "AI response structure incomplete."
+
+
+def display_chat_ui(weather_context, snapshot=None):
     st.subheader("Chat with AI")
 
     if 'messages' not in st.session_state:
@@ -87,19 +197,16 @@ def display_chat_ui():
 
     # If prompt is not empty
     if prompt:
-        # Fetch weather context (this can be an API call to a weather service or hardcoded for demo purposes)
-        weather_context = "The current weather in your location is sunny with a temperature of 25°C."  # Example context
-
-        # Get AI response with the weather context
-        response = get_ai_response(prompt, weather_context)
-
         # Add user message to session state
         st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Stream the AI response into the chat window as it arrives
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_ai_response(prompt, weather_context, snapshot))
 
         # Add AI response to session state
         st.session_state.messages.append({"role": "assistant", "content": response})
 
-        # Display AI response in the chat window
-        st.chat_message("assistant").markdown(response)
-
     return prompt
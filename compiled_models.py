@@ -0,0 +1,211 @@
+# compiled_models.py
+#
+# Compiled serving variants of the Keras .h5 models, selectable as registry
+# backends / inference engines:
+#
+#   xla          the Keras model under tf.function(jit_compile=True)
+#   tflite_fp16  TFLite with float16 weights
+#   tflite_int8  TFLite with int8 dynamic-range quantized weights
+#
+# Each exposes the predict(x, verbose=0) / get_weights() surface the registry
+# expects. Run the parity report to pick the fastest variant that stays
+# within tolerance on a given machine:
+#
+#   python compiled_models.py --intra-op-threads 1 --inter-op-threads 1
+#   python compiled_models.py --backends xla,tflite_int8 --output parity.json
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from model_registry import INPUT_SHAPE, THREADS, configure_threads, file_hash, import_tensorflow
+
+VARIANTS = ("xla", "tflite_fp16", "tflite_int8")
+
+# Converted .tflite files, named after the source .h5 hash so a retrained
+# model is converted again
+TFLITE_DIR = 'compiled_models'
+
+# The LSTM while-loops only convert with a static batch dimension and the
+# converted graph cannot be resized, so TFLite runs fixed batches of this
+# many windows, zero-padding the last one
+TFLITE_BATCH = 8
+
+# Parity tolerances against the original .h5 models
+MIN_CONDITION_AGREEMENT = 0.99
+MAX_FEATURE_MAE = {'temperature_2m': 0.1, 'relative_humidity_2m': 0.5, 'pressure_msl': 0.1, 'windspeed_10m': 0.1}
+
+PARITY_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Model Training', '5_day_weather_features.csv')
+
+
+class XLAModel:
+    # Batches are padded to the next power of two so XLA compiles a handful
+    # of shapes rather than one per batch size
+    def __init__(self, model):
+        tf = import_tensorflow()
+        self.model = model
+        self._forward = tf.function(lambda x: model(x, training=False), jit_compile=True)
+
+    def get_weights(self):
+        return self.model.get_weights()
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        n = len(x)
+        padded = 1 << max(n - 1, 0).bit_length()
+        if padded != n:
+            x = np.concatenate([x, np.zeros((padded - n,) + x.shape[1:], dtype=np.float32)])
+        return self._forward(x).numpy()[:n]
+
+
+class TFLiteModel:
+    # One interpreter per model; it holds the input/output buffers, so calls
+    # from scheduler and API threads are serialized
+    def __init__(self, content, num_threads=None):
+        tf = import_tensorflow()
+        self.content = content
+        self._lock = threading.Lock()
+        self.interpreter = tf.lite.Interpreter(model_content=content, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+        self.batch = self.interpreter.get_input_details()[0]['shape'][0]
+
+    def get_weights(self):
+        # The flatbuffer holds the (quantized) weights
+        return [np.frombuffer(self.content, dtype=np.uint8)]
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        n, b = len(x), self.batch
+        chunk = np.zeros((b,) + x.shape[1:], dtype=np.float32)
+        outputs = []
+        with self._lock:
+            for start in range(0, n, b):
+                part = x[start:start + b]
+                chunk[:len(part)] = part
+                chunk[len(part):] = 0
+                self.interpreter.set_tensor(self._input, chunk)
+                self.interpreter.invoke()
+                outputs.append(self.interpreter.get_tensor(self._output)[:len(part)].copy())
+        return np.concatenate(outputs)
+
+
+def convert_tflite(path, quantization, batch=TFLITE_BATCH):
+    # Converts one .h5 model; the concrete function is given without the
+    # Keras model as trackable so its variables are frozen into constants
+    tf = import_tensorflow()
+    model = tf.keras.models.load_model(path)
+    forward = tf.function(lambda x: model(x, training=False),
+                          input_signature=[tf.TensorSpec((batch,) + INPUT_SHAPE, tf.float32)])
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()])
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def load_tflite(path, quantization, cache_dir=TFLITE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cached = os.path.join(os.path.dirname(path), cache_dir,
+                          f"{stem}.{file_hash(path)[:16]}.{quantization}.b{TFLITE_BATCH}.tflite")
+    if os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            content = f.read()
+    else:
+        content = convert_tflite(path, quantization)
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp_path = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, cached)
+    return TFLiteModel(content, num_threads=THREADS['intra_op'])
+
+
+def load_xla(path):
+    tf = import_tensorflow()
+    return XLAModel(tf.keras.models.load_model(path))
+
+
+def parity_windows(path=PARITY_FIXTURE, shifts=8):
+    # Realistic inputs: the 120 sample hours rolled by several offsets, for
+    # every city code
+    from automate_forecast import TARGET_COLUMNS, _stack_windows, city_details
+    import pandas as pd
+
+    values = pd.read_csv(path)[TARGET_COLUMNS].to_numpy(dtype=np.float32)
+    windows = [np.roll(values, 15 * s, axis=0) for s in range(shifts)]
+    codes = [details[0] for details in city_details.values()]
+    return np.concatenate([_stack_windows(windows, [code] * len(windows)) for code in codes])
+
+
+def _timed(fn, X, repeat):
+    fn(X)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(X)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def parity_report(backends=VARIANTS, repeat=3):
+    # Condition agreement, max probability difference and per-feature MAE of
+    # each backend against the original Keras models on the same windows,
+    # with best-of-`repeat` latency for the whole batch
+    from automate_forecast import TARGET_COLUMNS, _predict_models
+    from model_registry import get_registry
+
+    X = parity_windows()
+    (ref_proba, ref_features), ref_time = _timed(lambda x: _predict_models(x, None, get_registry("keras")), X, repeat)
+    report = {'windows': len(X), 'reference': {'backend': 'keras', 'latency_s': round(ref_time, 4)}, 'backends': {}}
+
+    for backend in backends:
+        registry = get_registry(backend)
+        (proba, features), seconds = _timed(lambda x: _predict_models(x, None, registry), X, repeat)
+        agreement = float((proba.argmax(-1) == ref_proba.argmax(-1)).mean())
+        mae = dict(zip(TARGET_COLUMNS, np.abs(features - ref_features).mean(axis=(0, 1)).round(5).tolist()))
+        report['backends'][backend] = {
+            'condition_agreement': round(agreement, 5),
+            'max_probability_diff': round(float(np.abs(proba - ref_proba).max()), 5),
+            'feature_mae': mae,
+            'latency_s': round(seconds, 4),
+            'speedup': round(ref_time / seconds, 2),
+            'model_bytes': registry.stats()['memory_bytes'],
+            'within_tolerance': agreement >= MIN_CONDITION_AGREEMENT
+                                and all(mae[k] <= MAX_FEATURE_MAE[k] for k in TARGET_COLUMNS),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity and latency of compiled model variants vs the .h5 models.")
+    parser.add_argument("--backends", default=",".join(VARIANTS), help="Comma-separated subset of " + ", ".join(VARIANTS))
+    parser.add_argument("--intra-op-threads", type=int, help="Threads per op (TensorFlow intra-op pool, TFLite interpreter)")
+    parser.add_argument("--inter-op-threads", type=int, help="Threads running independent ops (TensorFlow inter-op pool)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    backends = [b for b in args.backends.split(",") if b]
+    for backend in backends:
+        if backend not in VARIANTS:
+            parser.error(f"Unknown backend: {backend}")
+
+    report = parity_report(backends, args.repeat)
+    print(f"{report['windows']} windows, keras reference {report['reference']['latency_s'] * 1000:.1f} ms")
+    for backend, r in report['backends'].items():
+        mae = ", ".join(f"{k} {v:.4f}" for k, v in r['feature_mae'].items())
+        print(f"{backend:<12} {r['latency_s'] * 1000:8.1f} ms ({r['speedup']:.2f}x)  "
+              f"agreement {r['condition_agreement']:.4f}  MAE {mae}  {r['model_bytes'] / 1e6:.2f} MB  "
+              f"{'OK' if r['within_tolerance'] else 'OUT OF TOLERANCE'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    sys.exit(0 if all(r['within_tolerance'] for r in report['backends'].values()) else 1)
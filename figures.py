@@ -0,0 +1,114 @@
+# figures.py
+#
+# Dashboard charts, built once per (city, day, forecast version) and shared
+# by every session in the server process. The four feature lines are panels
+# of one subplot figure, so a page view ships two figures instead of five.
+# Each entry keeps the built Figure (what st.plotly_chart wants; handing it
+# JSON makes Streamlit re-validate the whole spec) together with its
+# serialized JSON, whose size is the chart payload of a page view.
+#
+# plotly is imported on the first build, not at import time.
+
+import threading
+from collections import OrderedDict
+
+import metrics
+
+CONDITION_COLORS = {'Sunny': '#FFD700', 'Cloudy': '#A9A9A9', 'Rainy': '#1E90FF', 'Clear': '#ADD8E6'}
+
+# (column, panel title, line colour) in row-major 2 x 2 panel order
+FEATURE_PANELS = (
+    ('temperature_2m', "Temperature (°C)", '#FF6347'),
+    ('relative_humidity_2m', "Humidity (%)", '#20B2AA'),
+    ('pressure_msl', "Pressure (hPa)", '#4682B4'),
+    ('windspeed_10m', "Wind Speed (km/h)", '#8A2BE2'),
+)
+
+
+def condition_figure(city, day_pred):
+    import plotly.express as px
+
+    fig = px.bar(
+        day_pred,
+        x='time',
+        y=[1] * len(day_pred),
+        color='Predicted_Weather',
+        labels={'x': 'Time', 'y': ''},
+        color_discrete_map=CONDITION_COLORS,
+        title=f"Hourly Weather Prediction - {city}"
+    )
+    fig.update_layout(showlegend=True, yaxis={'visible': False}, xaxis=dict(tickformat='%H:%M'))
+    return fig
+
+
+def feature_figure(day_weather):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=2, cols=2, subplot_titles=[title for _, title, _ in FEATURE_PANELS],
+                        vertical_spacing=0.12)
+    for i, (column, title, color) in enumerate(FEATURE_PANELS):
+        fig.add_trace(
+            go.Scatter(x=day_weather['time'], y=day_weather[column], name=title, mode='lines+markers',
+                       line=dict(shape='spline', color=color)),
+            row=i // 2 + 1, col=i % 2 + 1,
+        )
+    fig.update_layout(height=800, showlegend=False)
+    return fig
+
+
+class CachedFigure:
+    def __init__(self, figure):
+        self.figure = figure
+        self.json = figure.to_json()
+        self.nbytes = len(self.json.encode())
+
+
+class FigureCache:
+    # LRU of {'conditions': CachedFigure or None, 'features': CachedFigure}
+    # per (city, day, version). Entries for a city's older versions can be
+    # dropped with invalidate() once a new version is published.
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, view, day):
+        key = (view.city, day, view.version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry
+
+        with metrics.timer("dashboard_figure_build", city=view.city):
+            day_view = view.day(day)
+            entry = {
+                'conditions': (CachedFigure(condition_figure(view.city, day_view.pred))
+                               if not day_view.pred.empty else None),
+                'features': CachedFigure(feature_figure(day_view.weather)),
+            }
+        with self._lock:
+            # Another session may have built the same key meanwhile; either
+            # copy is fine, keep the first
+            entry = self._entries.setdefault(key, entry)
+            self._entries.move_to_end(key)
+            self.counters['misses'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        return entry
+
+    def invalidate(self, city, keep_version=None):
+        # Drops the city's entries except those for keep_version
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == city and key[2] != keep_version]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+
+def payload_bytes(entry):
+    return sum(cached.nbytes for cached in entry.values() if cached is not None)
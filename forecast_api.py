@@ -0,0 +1,352 @@
+# forecast_api.py
+#
+# JSON forecast service for downstream consumers, so they no longer need to
+# scrape the dashboard's CSVs.
+#
+#   GET /forecast?city=Chennai
+#   GET /forecast?lat=12.97&lon=77.59
+#   GET /health
+#   GET /metrics
+#
+# Concurrent requests for the same city or grid cell share one in-flight
+# computation: 100 simultaneous Chennai requests cost one fetch and one
+# inference. Responses carry an ETag and Last-Modified header taken from the
+# forecast version, and If-None-Match / If-Modified-Since get a 304 when the
+# data has not changed. Once `max_pending` distinct computations are queued,
+# new ones are turned away with 503 + Retry-After rather than queued without
+# bound. Built on asyncio streams, so it needs no web framework.
+#
+#   python forecast_api.py --port 8080 --engine numpy
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+
+import automate_forecast
+import metrics
+from automate_forecast import city_details, forecast_store, run_forecast
+from forecast_cache import forecast_hour
+from forecast_store import CONDITION_LABELS, FEATURE_COLUMNS
+from model_registry import model_version
+
+MAX_HEADER_BYTES = 16 * 1024
+IDLE_TIMEOUT = 30  # seconds a keep-alive connection may sit idle
+RETRY_AFTER = 5  # seconds, sent with 503s
+PAYLOAD_CACHE_ENTRIES = 256
+
+
+class Overloaded(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _republishing(city_name):
+    return HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"Forecast for {city_name} is being republished, retry later",
+                     {'Retry-After': str(RETRY_AFTER)})
+
+
+def _http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def _payload(meta, times, features, condition_codes):
+    # One JSON document per forecast version: metadata plus one object per
+    # forecast hour
+    times = np.datetime_as_string(np.asarray(times, dtype='datetime64[s]'), unit='s')
+    labels = np.asarray(CONDITION_LABELS)[np.asarray(condition_codes)]
+    values = np.asarray(features, dtype=float).round(3).tolist()
+    hours = [
+        {'time': t, 'condition': str(label), **dict(zip(FEATURE_COLUMNS, row))}
+        for t, label, row in zip(times.tolist(), labels, values)
+    ]
+    return json.dumps({**meta, 'hours': hours}).encode()
+
+
+class ForecastService:
+    # Request handling independent of the HTTP framing: resolves a query to
+    # (etag, last_modified, body), coalescing concurrent work per key
+    def __init__(self, engine="numpy", workers=2, max_pending=32):
+        self.engine = engine
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="forecast-api")
+        self._flights = {}  # key -> asyncio.Future shared by every waiter
+        self._refreshed = {}  # city -> forecast hour it was last brought up to date
+        self._payloads = {}  # (key, version) -> encoded body
+        self.counters = {'requests': 0, 'computations': 0, 'coalesced': 0, 'not_modified': 0, 'rejected': 0}
+
+    async def _single_flight(self, key, fn, *args):
+        # Runs fn(*args) on the executor once for all concurrent callers of
+        # `key`; later callers await the same future
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.counters['coalesced'] += 1
+            metrics.count("api_coalesced_total")
+            return await asyncio.shield(flight)
+        if len(self._flights) >= self.max_pending:
+            self.counters['rejected'] += 1
+            metrics.count("api_rejected_total")
+            raise Overloaded()
+
+        loop = asyncio.get_running_loop()
+        flight = loop.run_in_executor(self._executor, fn, *args)
+        self._flights[key] = flight
+        self.counters['computations'] += 1
+        try:
+            return await asyncio.shield(flight)
+        finally:
+            self._flights.pop(key, None)
+
+    def _remember(self, key, version, body):
+        if len(self._payloads) >= PAYLOAD_CACHE_ENTRIES:
+            self._payloads.pop(next(iter(self._payloads)))
+        self._payloads[(key, version)] = body
+        return body
+
+    async def city(self, city_name):
+        if city_name not in city_details:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"City not supported: {city_name}")
+        hour = forecast_hour()
+        entry = forecast_store.read_index().get(city_name)
+        if entry is None or (forecast_hour(entry['updated_at']) != hour and self._refreshed.get(city_name) != hour):
+            # Nothing published this hour, by the scheduler (incremental or
+            # not) or by us: fetch and predict. The scheduler's incremental
+            # path never fills forecast_cache, so only the store says whether
+            # it already ran.
+            await self._single_flight(('city', city_name), run_forecast, city_name, self.engine)
+            self._refreshed[city_name] = hour
+            entry = forecast_store.read_index()[city_name]
+
+        # Load before answering so the ETag names the version actually
+        # served. A version published and pruned by the scheduler since the
+        # index was read gets one retry with the newest version.
+        record = None
+        for _ in range(2):
+            version, updated_at = entry['latest'], entry['updated_at']
+            if (city_name, version) in self._payloads:
+                break
+            try:
+                _, record = forecast_store.load(city_name, version)
+                break
+            except FileNotFoundError:
+                entry = forecast_store.read_index()[city_name]
+        else:
+            raise _republishing(city_name)
+
+        async def body():
+            cached = self._payloads.get((city_name, version))
+            if cached is not None:
+                return cached
+            if record is None:
+                raise _republishing(city_name)
+            meta = {'city': city_name, 'version': version, 'updated_at': _http_date(updated_at)}
+            return self._remember(city_name, version,
+                                  _payload(meta, record['time'], record['features'], record['condition']))
+
+        return f'"{version}"', updated_at, body
+
+    def _forecast_cell(self, lat, lon):
+        import locations
+        return locations.forecast_points([(lat, lon)], engine=self.engine)[0]
+
+    async def point(self, lat, lon):
+        if not (np.isfinite([lat, lon]).all() and abs(lat) <= 90 and abs(lon) <= 180):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "lat/lon out of range")
+        import locations
+        centres, _ = locations.grid_cells([lat], [lon])
+        cell_lat, cell_lon = (float(v) for v in centres[0])
+        # A cell's forecast changes once per forecast hour or when the models
+        # are reloaded, so the version is known before any work is done and a
+        # 304 costs nothing
+        hour = forecast_hour()
+        models = (model_version(self.engine) or 'none')[:12]
+        version = f"{cell_lat:.4f}_{cell_lon:.4f}_{hour}_{self.engine}_{models}"
+        key = ('cell', cell_lat, cell_lon)
+
+        async def body():
+            cached = self._payloads.get((key, version))
+            if cached is not None:
+                return cached
+            result = await self._single_flight(key + (version,), self._forecast_cell, cell_lat, cell_lon)
+            conditions, features = result['conditions'], result['features']
+            codes = {label: i for i, label in enumerate(CONDITION_LABELS)}
+            meta = {'cell': [cell_lat, cell_lon], 'city': result['city'],
+                    'distance_km': round(result['distance_km'], 1), 'version': version,
+                    'updated_at': _http_date(hour * 3600)}
+            return self._remember(key, version, _payload(
+                meta, conditions['time'].to_numpy(), features[FEATURE_COLUMNS].to_numpy(),
+                conditions['Predicted_Weather'].map(codes).to_numpy()))
+
+        return f'"{version}"', hour * 3600, body
+
+    def health(self):
+        return {'engine': self.engine, 'in_flight': len(self._flights), 'max_pending': self.max_pending,
+                **self.counters}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def _not_modified(headers, etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _response(status, body=b'', headers=None, head=False, keep_alive=True):
+    status = HTTPStatus(status)
+    headers = {
+        'Date': _http_date(time.time()),
+        'Server': 'forecast-api',
+        'Content-Length': str(len(body)),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+        **(headers or {}),
+    }
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (b'' if head else body)
+
+
+class ForecastServer:
+    # Minimal HTTP/1.1 front end (GET/HEAD, keep-alive) over ForecastService
+    def __init__(self, service):
+        self.service = service
+
+    async def _route(self, method, target, headers):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == '/health':
+            return HTTPStatus.OK, 'application/json', json.dumps(self.service.health()).encode(), {}
+        if url.path == '/metrics':
+            return HTTPStatus.OK, 'text/plain; version=0.0.4', metrics.render_prometheus().encode(), {}
+        if url.path != '/forecast':
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+
+        if 'city' in query:
+            etag, last_modified, body = await self.service.city(query['city'])
+        elif 'lat' in query and 'lon' in query:
+            try:
+                lat, lon = float(query['lat']), float(query['lon'])
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "lat and lon must be numbers")
+            etag, last_modified, body = await self.service.point(lat, lon)
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Pass city=<name> or lat=<lat>&lon=<lon>")
+
+        validators = {'ETag': etag, 'Last-Modified': _http_date(last_modified), 'Cache-Control': 'no-cache'}
+        if _not_modified(headers, etag, last_modified):
+            self.service.counters['not_modified'] += 1
+            return HTTPStatus.NOT_MODIFIED, None, b'', validators
+        return HTTPStatus.OK, 'application/json', await body(), validators
+
+    async def handle(self, method, target, headers):
+        # Returns (status, body, extra headers) for one request
+        self.service.counters['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, json.dumps({'error': f"{method} not allowed"}).encode(), {
+                'Content-Type': 'application/json', 'Allow': 'GET, HEAD'}
+        try:
+            status, content_type, body, extra = await self._route(method, target, headers)
+        except Overloaded:
+            return HTTPStatus.SERVICE_UNAVAILABLE, b'{"error": "Forecast workers saturated, retry later"}', {
+                'Content-Type': 'application/json', 'Retry-After': str(RETRY_AFTER)}
+        except HTTPError as e:
+            return e.status, json.dumps({'error': str(e)}).encode(), {'Content-Type': 'application/json', **e.headers}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, json.dumps({'error': str(e)}).encode(), {'Content-Type': 'application/json'}
+        except requests.RequestException as e:
+            return HTTPStatus.BAD_GATEWAY, json.dumps({'error': f"Weather API error: {e}"}).encode(), {
+                'Content-Type': 'application/json'}
+        except Exception as e:
+            print(f"Error serving {target}: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, b'{"error": "Internal error"}', {'Content-Type': 'application/json'}
+        if content_type:
+            extra = {'Content-Type': content_type, **extra}
+        return status, body, extra
+
+    async def __call__(self, reader, writer):
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, keep_alive=False))
+                    await writer.drain()
+                    return
+
+                request_line, *header_lines = raw.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = request_line.split(' ')
+                except ValueError:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, keep_alive=False))
+                    await writer.drain()
+                    return
+                headers = {}
+                for line in header_lines:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                with metrics.timer("api_request"):
+                    status, body, extra = await self.handle(method, target, headers)
+                metrics.count("api_responses_total", status=int(status))
+                writer.write(_response(status, body, extra, head=method == 'HEAD', keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, engine="numpy", workers=2, max_pending=32):
+    service = ForecastService(engine=engine, workers=workers, max_pending=max_pending)
+    server = await asyncio.start_server(ForecastServer(service), host, port, limit=MAX_HEADER_BYTES)
+    print(f"Forecast API listening on http://{host}:{port} (engine={engine}, workers={workers})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve forecasts as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--engine", default="numpy", choices=sorted(automate_forecast.ENGINES))
+    parser.add_argument("--workers", type=int, default=2, help="Threads running fetch + inference")
+    parser.add_argument("--max-pending", type=int, default=32,
+                        help="Distinct forecasts computing at once before new ones get 503")
+    parser.add_argument("--metrics-log", help="Enable instrumentation and append JSON records to this file")
+    args = parser.parse_args()
+
+    metrics.enable(args.metrics_log)
+    try:
+        asyncio.run(serve(args.host, args.port, args.engine, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,127 @@
+# forecast_cache.py
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+def forecast_hour(now=None):
+    # Hours since the epoch (UTC); Open-Meteo windows start on the hour
+    return int((time.time() if now is None else now) // 3600)
+
+
+class ForecastCache:
+    # Two-tier cache for weather windows and model outputs: an in-memory LRU
+    # in front of one pickle file per key on disk. Keys are
+    # (lat, lon, forecast hour, inference engine, model version), entries
+    # expire after `ttl` seconds and both tiers are capped, evicting the least
+    # recently used / oldest entries. `version` is a callable taking the
+    # engine and returning the version of the models it currently loads, so
+    # results computed with other models are never served; the engine keeps
+    # lossy variants (e.g. tflite_int8) apart from the reference models.
+    def __init__(self, cache_dir='weather_cache', ttl=3600, max_entries=128, max_disk_entries=1024, name='forecast',
+                 version=None):
+        self.name = name  # label on the cache_requests_total metric
+        self.version = version
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                         'expired': 0, 'evictions': 0, 'disk_evictions': 0}
+
+    def key(self, lat, lon, hour=None, engine=None):
+        return (round(float(lat), 4), round(float(lon), 4), forecast_hour() if hour is None else hour, engine,
+                self.version(engine) if self.version is not None else None)
+
+    def _path(self, key):
+        lat, lon, hour, engine, version = key
+        stamp = time.strftime('%Y%m%d%H', time.gmtime(hour * 3600))
+        suffix = (f"_{engine}" if engine else "") + (f"_{version[:16]}" if version else "")
+        return os.path.join(self.cache_dir, f"{lat:.4f}_{lon:.4f}_{stamp}{suffix}.pkl")
+
+    def _expired(self, record):
+        return time.time() - record['timestamp'] >= self.ttl
+
+    def _remember(self, key, record):
+        self._memory[key] = record
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, record):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._prune_disk()
+
+    def _prune_disk(self):
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.pkl')]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+                self.counters['disk_evictions'] += 1
+            except OSError:
+                pass
+
+    def get(self, key):
+        with self._lock:
+            record = self._memory.get(key)
+            tier = 'memory_hits'
+            if record is None:
+                record = self._read_disk(key)
+                tier = 'disk_hits'
+            if record is not None and self._expired(record):
+                self._memory.pop(key, None)
+                self.counters['expired'] += 1
+                record = None
+            if record is None:
+                self.counters['misses'] += 1
+                metrics.count("cache_requests_total", cache=self.name, result="miss")
+                return None
+            self._remember(key, record)
+            self.counters['hits'] += 1
+            self.counters[tier] += 1
+            metrics.count("cache_requests_total", cache=self.name, result="hit")
+            return record['value']
+
+    def put(self, key, value):
+        record = {'value': value, 'timestamp': time.time()}
+        with self._lock:
+            self._remember(key, record)
+            if self.cache_dir:
+                self._write_disk(key, record)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir and os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith('.pkl'):
+                        os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'memory_entries': len(self._memory)}
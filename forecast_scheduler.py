@@ -0,0 +1,147 @@
+# forecast_scheduler.py
+
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import automate_forecast
+import metrics
+
+
+class ForecastScheduler:
+    # Refreshes every configured city at a fixed cadence (aligned to the
+    # interval, so hourly runs happen on the hour) and publishes the results
+    # to the forecast store. Cities are split into batches that run on a
+    # bounded worker pool; per-city freshness is written to status.json next
+    # to the store index.
+    def __init__(self, cities=None, interval=3600, workers=2, batch_size=16, engine="numpy",
+                 incremental=True, store=None):
+        self.cities = list(cities or automate_forecast.city_details)
+        self.interval = interval
+        self.workers = workers
+        self.batch_size = batch_size
+        self.engine = engine
+        self.incremental = incremental
+        self.store = store or automate_forecast.forecast_store
+        self.cycles = 0
+        self.next_run = None
+        self.last_cycle_time = None
+        self.city_status = {city: {'last_checked': None, 'last_error': None} for city in self.cities}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def status_path(self):
+        return os.path.join(self.store.root, 'status.json')
+
+    def _refresh_batch(self, batch):
+        if self.incremental:
+            return automate_forecast.run_forecast_incremental(batch, engine=self.engine)
+        # Publishes only the cities it recomputed, so an unchanged forecast
+        # keeps its version (and the dashboard caches and API ETags with it)
+        return automate_forecast.run_forecast_batch(batch, engine=self.engine)
+
+    def run_once(self):
+        start = time.perf_counter()
+        batches = [self.cities[i:i + self.batch_size] for i in range(0, len(self.cities), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._refresh_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    future.result()
+                    error = None
+                except Exception as e:
+                    print(f"Forecast refresh failed for {batch}: {e}")
+                    error = repr(e)
+                with self._lock:
+                    for city_name in batch:
+                        self.city_status[city_name]['last_checked'] = time.time()
+                        self.city_status[city_name]['last_error'] = error
+        self.cycles += 1
+        self.last_cycle_time = time.perf_counter() - start
+        self.write_status()
+        return self.last_cycle_time
+
+    def status(self):
+        # Per-city freshness: age of the published version (lag) and of the
+        # last refresh attempt
+        now = time.time()
+        index = self.store.read_index()
+        with self._lock:
+            cities = {}
+            for city_name, state in self.city_status.items():
+                entry = index.get(city_name, {})
+                updated_at = entry.get('updated_at')
+                cities[city_name] = {
+                    'version': entry.get('latest'),
+                    'lag_s': None if updated_at is None else round(now - updated_at, 1),
+                    'last_checked': state['last_checked'],
+                    'last_error': state['last_error'],
+                }
+        return {
+            'cycles': self.cycles,
+            'interval_s': self.interval,
+            'last_cycle_s': self.last_cycle_time,
+            'next_run': self.next_run,
+            'cities': cities,
+            'written_at': now,
+        }
+
+    def write_status(self):
+        # A failed write (full disk, permissions) is logged and the
+        # scheduler keeps serving; the next cycle tries again
+        tmp_path = f"{self.status_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.store.root, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.status(), f, indent=1)
+            os.replace(tmp_path, self.status_path)
+        except OSError as e:
+            print(f"Could not write scheduler status to {self.status_path}: {e}")
+            metrics.count("errors_total", stage="scheduler_status", error=type(e).__name__)
+
+    def serve_forever(self):
+        # First cycle runs immediately, later ones on interval boundaries
+        while not self._stop.is_set():
+            self.run_once()
+            now = time.time()
+            self.next_run = (now // self.interval + 1) * self.interval
+            self.write_status()
+            self._stop.wait(self.next_run - now)
+
+    def start(self):
+        # Run in a daemon thread, e.g. inside the dashboard process
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.serve_forever, name="forecast-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def read_status(store=None):
+    # Scheduler status as last written, for readers in other processes
+    store = store or automate_forecast.forecast_store
+    try:
+        with open(os.path.join(store.root, 'status.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def serve(cities=None, **kwargs):
+    scheduler = ForecastScheduler(cities, **kwargs)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: scheduler._stop.set())
+    print(f"Scheduler refreshing {len(scheduler.cities)} cities every {scheduler.interval}s "
+          f"with {scheduler.workers} workers")
+    scheduler.serve_forever()
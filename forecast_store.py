@@ -0,0 +1,144 @@
+# forecast_store.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m']
+CONDITION_LABELS = ("Sunny", "Cloudy", "Rainy")
+
+
+def _record_dtype(hours):
+    # One record per file, each field a whole column: every column is a
+    # contiguous block in the file and a zero-copy view once memory-mapped
+    return np.dtype([
+        ('time', 'datetime64[s]', (hours,)),
+        ('features', np.float32, (hours, len(FEATURE_COLUMNS))),
+        ('condition', np.uint8, (hours,)),
+    ])
+
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _file_lock(path):
+    # Exclusive advisory lock held across processes (the dashboard, the
+    # --serve daemon and the forecast API can all publish)
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ForecastStore:
+    # One typed .npy file per (city, run timestamp) plus a small index.json
+    # naming the latest version per city. Files are written to a temp path
+    # and renamed into place, so readers only ever see complete versions.
+    # Index updates hold index.lock, so concurrent publishers in different
+    # processes never drop each other's entries.
+    def __init__(self, root='forecast_store', keep_versions=24):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, 'index.json')
+
+    def _path(self, city, version):
+        return os.path.join(self.root, city, f"{version}.npy")
+
+    def read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def latest_version(self, city):
+        entry = self.read_index().get(city)
+        return entry['latest'] if entry else None
+
+    def save(self, city, times, features, condition_codes):
+        times = np.asarray(times, dtype='datetime64[s]')
+        record = np.zeros((), dtype=_record_dtype(len(times)))
+        record['time'] = times
+        record['features'] = features
+        record['condition'] = condition_codes
+
+        seconds, nanos = divmod(time.time_ns(), 10**9)
+        version = time.strftime('%Y%m%dT%H%M%S', time.gmtime(seconds)) + f"{nanos:09d}"
+        os.makedirs(os.path.join(self.root, city), exist_ok=True)
+        _atomic_write(self._path(city, version), lambda f: np.save(f, record))
+
+        with self._lock, _file_lock(os.path.join(self.root, 'index.lock')):
+            index = self.read_index()
+            entry = index.get(city, {'versions': []})
+            versions = sorted(set(entry['versions'] + [version]))[-self.keep_versions:]
+            index[city] = {'latest': versions[-1], 'versions': versions, 'updated_at': time.time()}
+            _atomic_write(self.index_path, lambda f: f.write(json.dumps(index, indent=1).encode()))
+            self._prune(city, versions)
+        return version
+
+    def _prune(self, city, versions):
+        # Removes files older than the oldest kept version, including any
+        # orphaned by an earlier crash. Newer unindexed files may belong to
+        # a publisher that has not taken the lock yet, so they stay.
+        for name in os.listdir(os.path.join(self.root, city)):
+            stem, ext = os.path.splitext(name)
+            if ext == '.npy' and stem < versions[0]:
+                try:
+                    os.remove(os.path.join(self.root, city, name))
+                except OSError:
+                    pass
+
+    def save_frames(self, city, conditions, features):
+        codes = {label: i for i, label in enumerate(CONDITION_LABELS)}
+        return self.save(
+            city,
+            pd.to_datetime(conditions['time']).to_numpy(),
+            features[FEATURE_COLUMNS].to_numpy(dtype=np.float32),
+            conditions['Predicted_Weather'].map(codes).to_numpy(dtype=np.uint8),
+        )
+
+    def load(self, city, version=None):
+        # Memory-mapped record for the city's latest (or given) version
+        version = version or self.latest_version(city)
+        if version is None:
+            return None, None
+        return version, np.load(self._path(city, version), mmap_mode='r')
+
+    def load_frames(self, city, version=None):
+        # (conditions, features) DataFrames in the layout the dashboard uses
+        version, record = self.load(city, version)
+        if record is None:
+            return None, None
+        times = pd.DatetimeIndex(record['time'])
+        conditions = pd.DataFrame({
+            'time': times,
+            'Predicted_Weather': np.asarray(CONDITION_LABELS)[record['condition']],
+        })
+        features = pd.DataFrame(record['features'], columns=FEATURE_COLUMNS, copy=False)
+        features['time'] = times
+        return conditions, features
@@ -0,0 +1,55 @@
+# fused_inference.py
+
+import threading
+
+import tensorflow as tf
+
+from model_registry import INPUT_SHAPE, get_registry
+
+
+class FusedForecaster:
+    # Runs the condition and feature models as one compiled graph: a raw
+    # (batch, 120, 5) window goes in, class probabilities and de-scaled
+    # features come out. The fixed input signature means the graph is traced
+    # once, whatever the batch size.
+    def __init__(self, condition, features):
+        self.condition = condition
+        self.features = features
+
+        # Registry scalers are already compiled to (x - shift) * scale
+        self._shift1 = tf.constant(condition.scaler.shift)
+        self._scale1 = tf.constant(condition.scaler.scale)
+        self._shift2 = tf.constant(features.scaler.shift)
+        self._scale2 = tf.constant(features.scaler.scale)
+
+        self._forward = tf.function(
+            self._graph,
+            input_signature=[tf.TensorSpec((None,) + INPUT_SHAPE, tf.float32)],
+        )
+
+    def _graph(self, windows):
+        proba = self.condition.model((windows - self._shift1) * self._scale1, training=False)
+        scaled = self.features.model((windows - self._shift2) * self._scale2, training=False)
+        # Invert model 2's scaling on the four target columns only
+        features = scaled / self._scale2[:4] + self._shift2[:4]
+        return proba, features
+
+    def __call__(self, windows):
+        proba, features = self._forward(tf.convert_to_tensor(windows, dtype=tf.float32))
+        return proba.numpy(), features.numpy()
+
+
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+
+def get_fused_forecaster():
+    # Rebuilt only when the registry hands back a reloaded model
+    global _forecaster
+    registry = get_registry()
+    condition = registry.get("condition")
+    features = registry.get("features")
+    with _forecaster_lock:
+        if _forecaster is None or _forecaster.condition is not condition or _forecaster.features is not features:
+            _forecaster = FusedForecaster(condition, features)
+        return _forecaster
@@ -0,0 +1,131 @@
+# locations.py
+#
+# Forecasts for arbitrary (lat, lon) points. Each point is snapped to a
+# fixed lat/lon grid cell and every distinct cell is mapped to the nearest
+# trained city, whose code is the model's city feature. Fetching, caching
+# and inference happen once per cell, in batches, so the cost grows with the
+# number of unique cells rather than the number of requested points.
+#
+#   python locations.py 12.97,77.59 12.98,77.60 19.07,72.88
+#   python locations.py --csv sites.csv --engine numpy
+
+import argparse
+import time
+
+import numpy as np
+
+import automate_forecast
+from automate_forecast import city_details, forecast_cache, predict_batch
+from utils import fetch_weather_bulk
+
+EARTH_RADIUS_KM = 6371.0
+GRID_RESOLUTION = 0.1  # degrees, ~11 km; about the Open-Meteo model grid spacing
+BATCH_SIZE = 256  # cells per fetch + inference batch
+
+CITY_NAMES = list(city_details)
+CITY_CODES = np.array([city_details[name][0] for name in CITY_NAMES])
+CITY_COORDS = np.radians([city_details[name][1:] for name in CITY_NAMES])
+
+
+def nearest_city(lats, lons):
+    # Great-circle (haversine) distance from every point to every city in
+    # one (N, cities) broadcast; with a handful of cities this exact brute
+    # force beats building a tree. Returns (city index, distance km).
+    lat = np.radians(np.asarray(lats, dtype=float))[:, None]
+    lon = np.radians(np.asarray(lons, dtype=float))[:, None]
+    city_lat, city_lon = CITY_COORDS[:, 0], CITY_COORDS[:, 1]
+    a = (np.sin((city_lat - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(city_lat) * np.sin((city_lon - lon) / 2) ** 2)
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    index = distances.argmin(axis=1)
+    return index, distances[np.arange(len(index)), index]
+
+
+def grid_cells(lats, lons, resolution=GRID_RESOLUTION):
+    # Unique grid cells for the points: (cell centres (M, 2), inverse (N,))
+    # with points[i] falling in cells[inverse[i]]
+    points = np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)])
+    cells, inverse = np.unique(np.floor(points / resolution).astype(np.int64), axis=0, return_inverse=True)
+    centres = ((cells + 0.5) * resolution).round(4)
+    return centres, inverse.reshape(-1)
+
+
+def forecast_cells(centres, engine="numpy", batch_size=BATCH_SIZE):
+    # One result per cell centre, through the same cache as run_forecast
+    city_index, _ = nearest_city(centres[:, 0], centres[:, 1])
+    keys = [forecast_cache.key(lat, lon, engine=engine) for lat, lon in centres]
+    results = [None] * len(centres)
+    missing = []
+    for i, key in enumerate(keys):
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            results[i] = cached['result']
+        else:
+            missing.append(i)
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        windows = fetch_weather_bulk([tuple(centres[i]) for i in batch])
+        fresh = predict_batch(windows, CITY_CODES[city_index[batch]], engine=engine)
+        for i, window, result in zip(batch, windows, fresh):
+            forecast_cache.put(keys[i], {'weather_data': window, 'result': result})
+            results[i] = result
+    return results
+
+
+def forecast_points(points, engine="numpy", resolution=GRID_RESOLUTION, max_distance_km=None,
+                    batch_size=BATCH_SIZE):
+    # points is a sequence of (lat, lon). Returns one dict per point with the
+    # cell it was snapped to, the city whose code the models used and the
+    # shared forecast ('conditions' / 'features' DataFrames) for that cell.
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not np.isfinite(points).all() or (np.abs(points[:, 0]) > 90).any() or (np.abs(points[:, 1]) > 180).any():
+        raise ValueError("Points must be finite (lat, lon) pairs within [-90, 90] x [-180, 180].")
+
+    centres, inverse = grid_cells(points[:, 0], points[:, 1], resolution)
+    cells = [(float(lat), float(lon)) for lat, lon in centres]
+    city_index, distances = nearest_city(centres[:, 0], centres[:, 1])
+    if max_distance_km is not None and (distances > max_distance_km).any():
+        far = cells[int(np.argmax(distances > max_distance_km))]
+        raise ValueError(f"Location {far} is more than {max_distance_km} km from any supported city.")
+
+    results = forecast_cells(centres, engine=engine, batch_size=batch_size)
+    return [
+        {
+            'lat': float(points[i, 0]),
+            'lon': float(points[i, 1]),
+            'cell': cells[c],
+            'city': CITY_NAMES[city_index[c]],
+            'distance_km': float(distances[c]),
+            **results[c],
+        }
+        for i, c in enumerate(inverse)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast arbitrary lat,lon points.")
+    parser.add_argument("points", nargs="*", help="Points as lat,lon")
+    parser.add_argument("--csv", help="CSV file with lat and lon columns")
+    parser.add_argument("--engine", default="numpy", choices=sorted(automate_forecast.ENGINES))
+    parser.add_argument("--resolution", type=float, default=GRID_RESOLUTION, help="Grid cell size in degrees")
+    parser.add_argument("--max-distance-km", type=float, help="Reject points farther than this from any city")
+    args = parser.parse_args()
+
+    coords = [tuple(map(float, p.split(','))) for p in args.points]
+    if args.csv:
+        import pandas as pd
+        coords += list(pd.read_csv(args.csv)[['lat', 'lon']].itertuples(index=False, name=None))
+    if not coords:
+        parser.error("No points given")
+
+    start = time.perf_counter()
+    forecasts = forecast_points(coords, engine=args.engine, resolution=args.resolution,
+                                max_distance_km=args.max_distance_km)
+    elapsed = time.perf_counter() - start
+    cells = {f['cell'] for f in forecasts}
+    print(f"{len(forecasts)} points -> {len(cells)} cells in {elapsed:.2f}s")
+    for f in forecasts[:20]:
+        first = f['conditions'].iloc[0]
+        print(f"({f['lat']:.4f}, {f['lon']:.4f}) cell {f['cell']} via {f['city']} ({f['distance_km']:.0f} km): "
+              f"{first['Predicted_Weather']} at {first['time']}")
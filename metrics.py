@@ -0,0 +1,203 @@
+# metrics.py
+#
+# Stage timers, counters and latency histograms for the forecast pipeline.
+# Disabled by default: timer() then returns a shared no-op context manager
+# and count() returns immediately, so instrumented code pays one global
+# lookup per call. Enable with FORECAST_METRICS=1 (or enable()) and read the
+# numbers as Prometheus text (render_prometheus / start_http_server) or as
+# JSON lines appended to FORECAST_METRICS_LOG.
+#
+#   with metrics.timer("fetch", city="Chennai"):
+#       ...
+#   metrics.count("cache_requests_total", cache="forecast", result="hit")
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, from cache hits to cold model loads
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "forecast_"
+
+_enabled = os.environ.get("FORECAST_METRICS", "") not in ("", "0")
+_log_path = os.environ.get("FORECAST_METRICS_LOG") or None
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+
+def enable(log_path=None):
+    global _enabled, _log_path
+    _enabled = True
+    if log_path is not None:
+        _log_path = log_path
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def count(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(stage, seconds, **labels):
+    # Records one stage latency in the stage_seconds histogram
+    if not _enabled:
+        return
+    key = _labels({'stage': stage, **labels})
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        hist[bisect_left(BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+    if _log_path:
+        _log({'event': 'stage', 'stage': stage, 'seconds': round(seconds, 6), **labels})
+
+
+def _log(record):
+    record['ts'] = time.time()
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        with open(_log_path, 'a') as f:
+            f.write(line)
+
+
+class _Timer:
+    __slots__ = ('stage', 'labels', 'start')
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            count("errors_total", stage=self.stage, error=exc_type.__name__)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(stage, **labels):
+    # Times the block into stage_seconds{stage, **labels}; exceptions are
+    # counted in errors_total and re-raised
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(stage, labels)
+
+
+def snapshot():
+    # Counters and histograms as plain dicts, e.g. for a JSON status dump
+    with _lock:
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in _counters.items()]
+        histograms = []
+        for labels, hist in _histograms.items():
+            total = sum(hist[:-1])
+            histograms.append({
+                'labels': dict(labels),
+                'count': total,
+                'sum': hist[-1],
+                'mean': hist[-1] / total if total else None,
+                'buckets': dict(zip([*map(str, BUCKETS), '+Inf'], hist[:-1])),
+            })
+    return {'enabled': _enabled, 'counters': counters, 'stage_seconds': histograms}
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items())
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+    name = f"{PREFIX}stage_seconds"
+    if histograms:
+        lines.append(f"# HELP {name} Latency of forecast pipeline stages.")
+        lines.append(f"# TYPE {name} histogram")
+    for labels, hist in histograms:
+        cumulative = 0
+        for bound, bucket in zip([*map(str, BUCKETS), '+Inf'], hist[:-1]):
+            cumulative += bucket
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics.json':
+            body, content_type = json.dumps(snapshot()).encode(), 'application/json'
+        else:
+            body, content_type = render_prometheus().encode(), 'text/plain; version=0.0.4'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host='127.0.0.1'):
+    # Serves /metrics (Prometheus text) and /metrics.json from a daemon thread
+    # and turns instrumentation on
+    enable()
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,217 @@
+# model_bundle.py
+#
+# Everything serving needs in one versioned file: both models' layer configs
+# and weights, the compiled scaler coefficients, the city-code mapping, the
+# label map and the input schema. Replaces parsing two .h5 files through
+# HDF5 and two scaler pickles through joblib (and the sklearn version
+# warnings that come with them) at every start.
+#
+# Layout: an 8-byte magic, a little-endian uint64 header length, a UTF-8 JSON
+# header, then the raw arrays, each aligned to 64 bytes. Loading reads the
+# header and memory-maps the file; every weight is a zero-copy view.
+#
+# The content hash is a sha256 over the hashed metadata and the array bytes
+# (not the file, so re-exporting identical artifacts gives the same hash).
+# It names the model version in the forecast cache keys.
+#
+#   python model_bundle.py export [--out forecast_models.bundle]
+#   python model_bundle.py info forecast_models.bundle [--verify]
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from scaling import AffineScaler
+
+MAGIC = b"FCBUNDL1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_PATH = 'forecast_models.bundle'
+
+
+def _content_hash(content, arrays):
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def write_bundle(path, content, arrays, sources=None):
+    # content: JSON-serialisable metadata covered by the hash; arrays: name ->
+    # ndarray. Written to a temp file and renamed into place.
+    arrays = {name: np.ascontiguousarray(a, dtype=np.dtype(a.dtype).newbyteorder('<')) for name, a in arrays.items()}
+    table, offset = {}, 0
+    for name in sorted(arrays):
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        table[name] = {'dtype': arrays[name].dtype.str, 'shape': list(arrays[name].shape), 'offset': offset}
+        offset += arrays[name].nbytes
+
+    header = {
+        'format': FORMAT_VERSION,
+        'content_hash': _content_hash(content, arrays),
+        'created_at': time.time(),
+        'sources': sources or {},
+        'content': content,
+        'arrays': table,
+    }
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+        for name in sorted(arrays):
+            f.write(b"\0" * (data_start + table[name]['offset'] - f.tell()))
+            f.write(memoryview(arrays[name]).cast('B'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header['content_hash']
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        (length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(length))
+    if header['format'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {header['format']} in {path}")
+    header['data_start'] = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+    return header
+
+
+def read_hash(path):
+    # The bundle's content hash, from the header alone
+    return read_header(path)['content_hash']
+
+
+class ModelBundle:
+    def __init__(self, path):
+        self.path = path
+        header = read_header(path)
+        self.content_hash = header['content_hash']
+        self.created_at = header['created_at']
+        self.sources = header['sources']
+        self.content = header['content']
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        start = header['data_start']
+        self.arrays = {
+            name: np.ndarray(entry['shape'], dtype=np.dtype(entry['dtype']), buffer=self._data,
+                             offset=start + entry['offset'])
+            for name, entry in header['arrays'].items()
+        }
+
+    @property
+    def label_map(self):
+        return {int(code): label for code, label in self.content['label_map'].items()}
+
+    @property
+    def city_codes(self):
+        return self.content['city_codes']
+
+    @property
+    def input_schema(self):
+        return self.content['input_schema']
+
+    @property
+    def models(self):
+        return list(self.content['models'])
+
+    def scaler(self, name):
+        return AffineScaler(self.arrays[f"{name}/scaler/scale"], self.arrays[f"{name}/scaler/shift"])
+
+    def numpy_model(self, name):
+        import numpy_engine
+
+        prefix = f"{name}/weights/"
+        layers = {}
+        for key, array in self.arrays.items():
+            if key.startswith(prefix):
+                layer, weight = key[len(prefix):].rsplit('/', 1)
+                layers.setdefault(layer, {})[weight] = array
+        return numpy_engine.build_model(self.content['models'][name]['config'], layers.__getitem__)
+
+    def verify(self):
+        # Recomputes the content hash over the mapped arrays
+        return _content_hash(self.content, self.arrays) == self.content_hash
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+
+def export_bundle(out_path=DEFAULT_PATH, specs=None, base_dir=None):
+    # Packs the current .h5 / .pkl artifacts into one bundle; returns its hash
+    import joblib
+
+    import numpy_engine
+    from automate_forecast import FEATURE_COLUMNS, LABEL_MAP, TARGET_COLUMNS, city_details
+    from model_registry import INPUT_SHAPE, MODEL_SPECS, file_hash
+
+    specs = specs or MODEL_SPECS
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    content = {
+        'label_map': {str(code): label for code, label in LABEL_MAP.items()},
+        'city_codes': {name: details[0] for name, details in city_details.items()},
+        'city_coordinates': {name: list(details[1:]) for name, details in city_details.items()},
+        'input_schema': {'shape': list(INPUT_SHAPE), 'dtype': 'float32', 'features': FEATURE_COLUMNS},
+        'models': {},
+    }
+    arrays, sources = {}, {}
+    for name, (model_file, scaler_file) in specs.items():
+        model_path, scaler_path = os.path.join(base_dir, model_file), os.path.join(base_dir, scaler_file)
+        config, weights = numpy_engine.read_h5(model_path)
+        scaler = AffineScaler.from_sklearn(joblib.load(scaler_path), dtype=np.float64)
+        content['models'][name] = {
+            'config': config,
+            'outputs': (list(LABEL_MAP.values()) if name == "condition" else TARGET_COLUMNS),
+        }
+        for layer, layer_weights in weights.items():
+            for weight, array in layer_weights.items():
+                arrays[f"{name}/weights/{layer}/{weight}"] = array
+        arrays[f"{name}/scaler/scale"] = scaler.scale
+        arrays[f"{name}/scaler/shift"] = scaler.shift
+        sources[name] = {model_file: file_hash(model_path), scaler_file: file_hash(scaler_path)}
+    return write_bundle(out_path, content, arrays, sources)
+
+
+if __name__ == "__main__":
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Export or inspect the single-file model bundle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Pack the .h5 models and .pkl scalers into one bundle")
+    export.add_argument("--out", default=DEFAULT_PATH)
+    info = commands.add_parser("info", help="Print a bundle's metadata")
+    info.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    info.add_argument("--verify", action="store_true", help="Recompute the content hash")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        warnings.filterwarnings("ignore")  # sklearn version warnings from the pickled scalers
+        start = time.perf_counter()
+        digest = export_bundle(args.out)
+        print(f"Wrote {args.out} ({os.path.getsize(args.out) / 1e6:.2f} MB) in {time.perf_counter() - start:.2f}s, "
+              f"content hash {digest[:16]}")
+    else:
+        start = time.perf_counter()
+        bundle = ModelBundle(args.path)
+        models = {name: bundle.numpy_model(name) for name in bundle.models}
+        elapsed = time.perf_counter() - start
+        print(f"{args.path}: content hash {bundle.content_hash[:16]}, {len(bundle.arrays)} arrays, "
+              f"{bundle.nbytes / 1e6:.2f} MB, opened in {elapsed * 1000:.1f} ms")
+        print(f"Models: {', '.join(f'{n} ({len(m.layers)} layers)' for n, m in models.items())}")
+        print(f"Labels: {bundle.label_map}  Cities: {bundle.city_codes}  Input: {bundle.input_schema}")
+        if args.verify:
+            ok = bundle.verify()
+            print("Content hash OK" if ok else "Content hash MISMATCH")
+            sys.exit(0 if ok else 1)
@@ -0,0 +1,322 @@
+# model_registry.py
+
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from scaling import AffineScaler
+
+# Model name to (weights file, scaler file) mapping
+MODEL_SPECS = {
+    "condition": ("model_1_180_rain.h5", "model_1_180_rain.pkl"),
+    "features": ("model_2_temp_hum_press.h5", "model_2_scaler.pkl"),
+}
+
+# Every model takes 120 hourly steps of 5 features
+INPUT_SHAPE = (120, 5)
+
+# Single-file model bundle (see model_bundle.py). The numpy backend loads
+# from it when it exists and was exported from the current loose .h5 / .pkl
+# files, and falls back to those files otherwise (e.g. after retraining
+# without re-exporting).
+MODEL_BUNDLE = os.environ.get('FORECAST_MODEL_BUNDLE', 'forecast_models.bundle')
+
+# Thread pools for the TensorFlow-backed backends (None lets TensorFlow
+# decide). Set with FORECAST_INTRA_OP_THREADS / FORECAST_INTER_OP_THREADS or
+# configure_threads(), before the first model load.
+THREADS = {
+    'intra_op': int(os.environ['FORECAST_INTRA_OP_THREADS']) if os.environ.get('FORECAST_INTRA_OP_THREADS') else None,
+    'inter_op': int(os.environ['FORECAST_INTER_OP_THREADS']) if os.environ.get('FORECAST_INTER_OP_THREADS') else None,
+}
+_tf_configured = False
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    if intra_op is not None:
+        THREADS['intra_op'] = intra_op
+    if inter_op is not None:
+        THREADS['inter_op'] = inter_op
+
+
+def import_tensorflow():
+    # TensorFlow is only imported when a TF-backed registry loads a model;
+    # thread pools can only be sized before TensorFlow first runs an op
+    global _tf_configured
+    import tensorflow as tf
+    if not _tf_configured:
+        _tf_configured = True
+        tf.random.set_seed(42)
+        if THREADS['intra_op']:
+            tf.config.threading.set_intra_op_parallelism_threads(THREADS['intra_op'])
+        if THREADS['inter_op']:
+            tf.config.threading.set_inter_op_parallelism_threads(THREADS['inter_op'])
+    return tf
+
+
+def _load_keras_model(path):
+    return import_tensorflow().keras.models.load_model(path)
+
+
+def _load_numpy_model(path):
+    import numpy_engine
+    return numpy_engine.load_model(path)
+
+
+def _load_compiled_model(variant):
+    def load(path):
+        import compiled_models
+        if variant == "xla":
+            return compiled_models.load_xla(path)
+        return compiled_models.load_tflite(path, variant.split("_", 1)[1])
+    return load
+
+
+# Backend name to model loader; see compiled_models.py for the XLA and TFLite
+# variants
+BACKENDS = {
+    "keras": _load_keras_model,
+    "numpy": _load_numpy_model,
+    "xla": _load_compiled_model("xla"),
+    "tflite_fp16": _load_compiled_model("tflite_fp16"),
+    "tflite_int8": _load_compiled_model("tflite_int8"),
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_bundle(path):
+    return path.endswith('.bundle')
+
+
+def _artifact_hash(path):
+    # Bundles carry their own content hash in the header
+    if _is_bundle(path):
+        from model_bundle import read_hash
+        return read_hash(path)
+    return file_hash(path)
+
+
+def _loose_paths(specs, base_dir):
+    return tuple(os.path.join(base_dir, p) for spec in specs.values() for p in spec)
+
+
+def _stamp(paths):
+    # mtimes, None for a missing file
+    return tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in paths)
+
+
+_bundle_memo = {}
+
+
+def bundle_is_current(bundle, specs=None, base_dir=None):
+    # True when the bundle exists and each loose artifact it was exported
+    # from is either absent or still has the hash recorded in its header.
+    # Rechecked (and a stale bundle reported) only when one of the files'
+    # mtimes changes.
+    specs = specs or MODEL_SPECS
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    bundle = os.path.abspath(bundle)
+    if not os.path.exists(bundle):
+        return False
+    loose = _loose_paths(specs, os.path.abspath(base_dir))
+    stamp = _stamp((bundle,) + loose)
+    cached = _bundle_memo.get((bundle, loose))
+    if cached is None or cached[0] != stamp:
+        from model_bundle import read_header
+        try:
+            sources = read_header(bundle)['sources']
+            current = all(
+                sources.get(name, {}).get(f) == file_hash(os.path.join(base_dir, f))
+                for name, spec in specs.items() for f in spec if os.path.exists(os.path.join(base_dir, f))
+            )
+        except (OSError, ValueError, KeyError):
+            current = False
+        if not current:
+            print(f"{bundle} does not match the current model files; loading those instead "
+                  "(re-export with python model_bundle.py export)")
+        cached = _bundle_memo[(bundle, loose)] = (stamp, current)
+    return cached[1]
+
+
+_version_memo = {}
+
+
+def model_version(engine=None, base_dir=None):
+    # Identifies the models `engine` computes forecasts with: the bundle's
+    # content hash when the numpy engine loads a current bundle, else a hash
+    # over the loose artifacts, which every other engine reads. Recomputed
+    # only when a file's mtime changes.
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    bundle = os.path.join(base_dir, MODEL_BUNDLE)
+    if engine == "numpy" and bundle_is_current(bundle, base_dir=base_dir):
+        paths = (bundle,)
+    else:
+        paths = _loose_paths(MODEL_SPECS, base_dir)
+    stamp = _stamp(paths)
+    if None in stamp:
+        return None
+    cached = _version_memo.get(paths)
+    if cached is None or cached[0] != stamp:
+        if len(paths) == 1:
+            version = _artifact_hash(bundle)
+        else:
+            version = hashlib.sha256(''.join(file_hash(p) for p in paths).encode()).hexdigest()
+        cached = _version_memo[paths] = (stamp, version)
+    return cached[1]
+
+
+class ModelEntry:
+    # One loaded model and its scaler (compiled to an AffineScaler) plus the
+    # numbers we report about it
+    def __init__(self, name, model, scaler, paths, mtimes, hashes, load_time, warmup_time):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.paths = paths
+        self.mtimes = mtimes
+        self.hashes = hashes
+        self.load_time = load_time
+        self.warmup_time = warmup_time
+        self.loaded_at = time.time()
+        self.memory_bytes = self._memory_footprint()
+
+    def _memory_footprint(self):
+        weights = sum(w.nbytes for w in self.model.get_weights())
+        scaler = sum(v.nbytes for v in vars(self.scaler).values() if isinstance(v, np.ndarray))
+        return int(weights + scaler)
+
+    def stats(self):
+        return {
+            'model_path': self.paths[0],
+            'scaler_path': self.paths[1],
+            'load_time_s': round(self.load_time, 4),
+            'warmup_time_s': round(self.warmup_time, 4),
+            'memory_bytes': self.memory_bytes,
+            'loaded_at': self.loaded_at,
+            'sha256': self.hashes[0],
+        }
+
+
+class ModelRegistry:
+    # Loads each model/scaler pair once per process and reloads it when the
+    # files on disk change. A changed mtime triggers a hash check, so touching
+    # a file without changing its bytes does not cost a reload.
+    def __init__(self, specs=None, base_dir=None, warmup=True, backend="keras", bundle=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {backend}")
+        if bundle is not None and backend != "numpy":
+            raise ValueError("Model bundles are only supported by the numpy backend")
+        self.backend = backend
+        self.specs = dict(specs or MODEL_SPECS)
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.bundle = bundle
+        self.warmup = warmup
+        self.reloads = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, name):
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+        if self.bundle is not None:
+            bundle = os.path.join(self.base_dir, self.bundle)
+            if bundle_is_current(bundle, self.specs, self.base_dir):
+                # Model and scaler both come from the bundle
+                return (bundle, bundle)
+        return tuple(os.path.join(self.base_dir, p) for p in self.specs[name])
+
+    def _load(self, name, paths):
+        mtimes = tuple(os.stat(p).st_mtime_ns for p in paths)
+        hashes = tuple(_artifact_hash(p) for p in paths)
+
+        start = time.perf_counter()
+        if _is_bundle(paths[0]):
+            # A header read and an mmap; weights are views into the file
+            from model_bundle import ModelBundle
+            bundle = ModelBundle(paths[0])
+            model = bundle.numpy_model(name)
+            scaler = bundle.scaler(name)
+        else:
+            # joblib (and sklearn, for unpickling) load with the first model
+            import joblib
+            model = BACKENDS[self.backend](paths[0])
+            scaler = AffineScaler.from_sklearn(joblib.load(paths[1]))
+        load_time = time.perf_counter() - start
+
+        # Warm up with a dummy window so the first real predict does not pay
+        # for graph construction
+        warmup_time = 0.0
+        if self.warmup:
+            start = time.perf_counter()
+            model.predict(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32), verbose=0)
+            warmup_time = time.perf_counter() - start
+
+        print(f"Loaded {name} model ({self.backend}) in {load_time:.2f}s (warm-up {warmup_time:.2f}s)")
+        metrics.observe("model_load", load_time, model=name, backend=self.backend)
+        metrics.observe("model_warmup", warmup_time, model=name, backend=self.backend)
+        return ModelEntry(name, model, scaler, paths, mtimes, hashes, load_time, warmup_time)
+
+    def _is_stale(self, entry):
+        # A file that is missing or being replaced (e.g. mid-retrain) keeps
+        # the loaded entry in service until it can be read again
+        try:
+            mtimes = tuple(os.stat(p).st_mtime_ns for p in entry.paths)
+            if mtimes == entry.mtimes:
+                return False
+            hashes = tuple(_artifact_hash(p) for p in entry.paths)
+        except (OSError, ValueError):
+            return False
+        if hashes == entry.hashes:
+            entry.mtimes = mtimes
+            return False
+        return True
+
+    def get(self, name):
+        paths = self._paths(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.paths != paths or self._is_stale(entry):
+                if entry is not None:
+                    self.reloads += 1
+                    metrics.count("model_reloads_total", model=name, backend=self.backend)
+                entry = self._load(name, paths)
+                self._entries[name] = entry
+            return entry
+
+    def load_all(self):
+        return {name: self.get(name) for name in self.specs}
+
+    def stats(self):
+        with self._lock:
+            models = {name: entry.stats() for name, entry in self._entries.items()}
+        return {
+            'backend': self.backend,
+            'models': models,
+            'reloads': self.reloads,
+            'memory_bytes': sum(m['memory_bytes'] for m in models.values()),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+def get_registry(backend="keras"):
+    with _registry_lock:
+        if backend not in _registries:
+            _registries[backend] = ModelRegistry(backend=backend, bundle=MODEL_BUNDLE if backend == "numpy" else None)
+        return _registries[backend]
@@ -0,0 +1,132 @@
+# news_digest.py
+#
+# Sidebar news digests, generated in the background and cached on disk per
+# (city, day) so every session shares them. The LLM response is parsed into
+# display-ready items once, when the digest is written.
+
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+NEWS_PROMPT = ("Give me 5 very short recent (within the last 7 days) news items about weather or climate in {city} "
+               "or in India, focusing on agricultural or general climate impacts. If there is a title, put it in bold "
+               "with **title**.")
+
+# chatbot.get_ai_response returns these instead of raising; they are never
+# cached as a digest
+FAILED_RESPONSES = (
+    "An error occurred", "AI response format unexpected.", "AI response structure incomplete.", "Unknown response format",
+)
+
+# After a failed refresh the next attempt waits RETRY_BACKOFF seconds,
+# doubling per consecutive failure up to MAX_RETRY_BACKOFF
+RETRY_BACKOFF = 60
+MAX_RETRY_BACKOFF = 3600
+
+
+def parse_news(news_response):
+    lines = news_response.strip().split("\n")
+
+    # Remove the first paragraph (non-news intro)
+    if lines and not re.match(r"\d\.", lines[0]):
+        while lines and not re.match(r"\d\.", lines[0]):
+            lines.pop(0)
+
+    items = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            # Replace any **bold text** with light blue HTML bold
+            line = re.sub(r"\*\*(.*?)\*\*", r"<strong style='color: lightblue;'>\1</strong>", line)
+            # Remove s from the end of the line if it's there.
+            line = line.rstrip('s')
+            items.append(line)
+    return items
+
+
+class NewsDigestService:
+    # get() never blocks on the LLM: it returns today's digest if there is
+    # one, otherwise the newest stale digest for the city (or None), and
+    # queues a background refresh unless the last one failed recently.
+    def __init__(self, generate, cache_dir='news_cache', workers=1):
+        self.generate = generate  # prompt -> response text
+        self.cache_dir = cache_dir
+        self._memory = {}
+        self._pending = set()
+        self._failures = {}  # (city, day) -> (consecutive failures, retry not before)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-digest")
+
+    def _path(self, city, day):
+        return os.path.join(self.cache_dir, f"{city}_{day.isoformat()}.json")
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _latest_stale(self, city):
+        if not os.path.isdir(self.cache_dir):
+            return None
+        names = sorted(n for n in os.listdir(self.cache_dir) if n.startswith(f"{city}_") and n.endswith('.json'))
+        return self._read(os.path.join(self.cache_dir, names[-1])) if names else None
+
+    def _refresh(self, city, day):
+        key = (city, day)
+        try:
+            response = self.generate(NEWS_PROMPT.format(city=city))
+            if not response or response.startswith(FAILED_RESPONSES):
+                raise ValueError(f"no usable response: {response!r}")
+            items = parse_news(response)
+            if not items:
+                raise ValueError("response has no news items")
+            digest = {'city': city, 'day': day.isoformat(), 'items': items, 'generated_at': time.time()}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(city, day)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(digest, f)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._memory[key] = digest
+                self._failures.pop(key, None)
+        except Exception as e:
+            # Runs on the pool, so nothing else would see the exception
+            with self._lock:
+                failures = self._failures.get(key, (0, 0))[0] + 1
+                backoff = min(RETRY_BACKOFF * 2 ** (failures - 1), MAX_RETRY_BACKOFF)
+                self._failures[key] = (failures, time.time() + backoff)
+            print(f"News digest for {city} failed ({failures} in a row, retrying in {backoff}s): {e!r}")
+            metrics.count("errors_total", stage="news_digest", error=type(e).__name__)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def get(self, city, day=None):
+        # Returns (digest or None, is_fresh)
+        day = day or datetime.date.today()
+        key = (city, day)
+        with self._lock:
+            digest = self._memory.get(key)
+        if digest is None:
+            digest = self._read(self._path(city, day))
+            if digest is not None:
+                with self._lock:
+                    self._memory[key] = digest
+        if digest is not None:
+            return digest, True
+
+        with self._lock:
+            failure = self._failures.get(key)
+            if key not in self._pending and (failure is None or time.time() >= failure[1]):
+                self._pending.add(key)
+                self._pool.submit(self._refresh, city, day)
+        return self._latest_stale(city), False
@@ -0,0 +1,202 @@
+# numpy_engine.py
+#
+# TensorFlow-free forward pass for the forecast models. The weights are read
+# straight from the Keras .h5 files with h5py (or from a model bundle, see
+# model_bundle.py) and the LSTM / TimeDistributed Dense stack is evaluated in
+# vectorized NumPy, batched over cities.
+
+import json
+import sys
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+}
+
+
+class LSTMLayer:
+    def __init__(self, name, config, kernel, recurrent_kernel, bias):
+        self.name = name
+        self.units = config['units']
+        self.return_sequences = config.get('return_sequences', False)
+        self.activation = ACTIVATIONS[config.get('activation', 'tanh')]
+        self.recurrent_activation = ACTIVATIONS[config.get('recurrent_activation', 'sigmoid')]
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+
+    def weights(self):
+        return [self.kernel, self.recurrent_kernel, self.bias]
+
+    def __call__(self, x):
+        batch, steps, _ = x.shape
+        u = self.units
+        # Input projections for every timestep in one matmul; only the
+        # recurrent part has to run step by step
+        z_in = x @ self.kernel + self.bias
+        h = np.zeros((batch, u), dtype=x.dtype)
+        c = np.zeros((batch, u), dtype=x.dtype)
+        outputs = np.empty((batch, steps, u), dtype=x.dtype) if self.return_sequences else None
+        for t in range(steps):
+            z = z_in[:, t] + h @ self.recurrent_kernel
+            # Keras gate order: input, forget, cell, output
+            i = self.recurrent_activation(z[:, :u])
+            f = self.recurrent_activation(z[:, u:2 * u])
+            g = self.activation(z[:, 2 * u:3 * u])
+            o = self.recurrent_activation(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+
+class DenseLayer:
+    # Dense on the last axis, which is also what TimeDistributed(Dense) does
+    def __init__(self, name, config, kernel, bias):
+        self.name = name
+        self.activation = ACTIVATIONS[config.get('activation', 'linear')]
+        self.kernel = kernel
+        self.bias = bias
+
+    def weights(self):
+        return [self.kernel, self.bias]
+
+    def __call__(self, x):
+        return self.activation(x @ self.kernel + self.bias)
+
+
+class DropoutLayer:
+    # Identity at inference time. With training=True it drops units the way
+    # Keras does (inverted dropout: zero with probability `rate`, scale the
+    # rest by 1 / (1 - rate)), which is what Monte Carlo dropout needs.
+    def __init__(self, name, config):
+        self.name = name
+        self.rate = config.get('rate', 0.0)
+
+    def weights(self):
+        return []
+
+    def __call__(self, x, training=False, rng=None):
+        if not training or self.rate == 0:
+            return x
+        rng = rng if rng is not None else np.random.default_rng()
+        mask = rng.random(x.shape, dtype=np.float32) >= self.rate
+        return x * (mask * np.float32(1.0 / (1.0 - self.rate)))
+
+
+def _layer_weights(group):
+    # Collect the datasets under a layer group keyed by their short name
+    # (kernel, recurrent_kernel, bias), whatever the nesting looks like
+    import h5py
+    found = {}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            found[name.rsplit('/', 1)[-1].split(':')[0]] = obj[()].astype(np.float32)
+
+    group.visititems(visit)
+    return found
+
+
+def _build_layer(layer, weights):
+    # weights(name) returns the layer's arrays keyed by short name
+    class_name = layer['class_name']
+    config = layer['config']
+    name = config['name']
+
+    if class_name == 'TimeDistributed':
+        inner = config['layer']
+        if inner['class_name'] != 'Dense':
+            raise ValueError(f"Unsupported TimeDistributed layer: {inner['class_name']}")
+        w = weights(name)
+        return DenseLayer(name, inner['config'], w['kernel'], w['bias'])
+    if class_name == 'Dense':
+        w = weights(name)
+        return DenseLayer(name, config, w['kernel'], w['bias'])
+    if class_name == 'LSTM':
+        w = weights(name)
+        return LSTMLayer(name, config, w['kernel'], w['recurrent_kernel'], w['bias'])
+    if class_name == 'Dropout':
+        return DropoutLayer(name, config)
+    if class_name == 'InputLayer':
+        return None
+    raise ValueError(f"Unsupported layer type: {class_name}")
+
+
+class NumpyModel:
+    def __init__(self, layers):
+        self.layers = layers
+
+    def get_weights(self):
+        return [w for layer in self.layers for w in layer.weights()]
+
+    def predict(self, x, verbose=0, training=False, rng=None):
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            x = layer(x, training, rng) if isinstance(layer, DropoutLayer) else layer(x)
+        return x
+
+    __call__ = predict
+
+
+def build_model(config, weights):
+    # config is the Keras model_config dict, weights as for _build_layer
+    if config['class_name'] != 'Sequential':
+        raise ValueError(f"Only Sequential models are supported, got {config['class_name']}")
+    layers = [_build_layer(layer, weights) for layer in config['config']['layers']]
+    return NumpyModel([layer for layer in layers if layer is not None])
+
+
+def read_h5(path):
+    # (model config, {layer name: {weight name: float32 array}}) from a Keras .h5
+    import h5py
+    with h5py.File(path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        weights_group = f['model_weights']
+        weights = {name: _layer_weights(weights_group[name]) for name in weights_group}
+    return config, {name: w for name, w in weights.items() if w}
+
+
+def load_model(path):
+    config, weights = read_h5(path)
+    return build_model(config, weights.__getitem__)
+
+
+def check_parity(path, batch=4, seed=0):
+    # Compare this engine against Keras on random scaled windows. Returns the
+    # max absolute difference; imports TensorFlow, so keep it out of serving.
+    from tensorflow.keras.models import load_model as load_keras_model
+
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((batch, 120, 5)).astype(np.float32)
+    expected = load_keras_model(path).predict(x, verbose=0)
+    actual = load_model(path).predict(x)
+    return float(np.abs(expected - actual).max())
+
+
+if __name__ == '__main__':
+    # python numpy_engine.py [model.h5 ...] -- parity check against Keras
+    paths = sys.argv[1:] or ['model_1_180_rain.h5', 'model_2_temp_hum_press.h5']
+    failed = False
+    for path in paths:
+        diff = check_parity(path)
+        ok = diff < 1e-4
+        failed |= not ok
+        print(f"{path}: max abs diff {diff:.2e} {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,91 @@
+# scaling.py
+#
+# Fitted StandardScaler / MinMaxScaler parameters compiled into plain
+# per-column shift/scale arrays. Forward and inverse scaling are then two
+# ufunc calls each, broadcast over (..., features) batches and done in place
+# when given `out`, with no sklearn calls, DataFrames or feature-name
+# validation at serving time. Run `python scaling.py` to check parity with
+# sklearn on the shipped scalers.
+
+import sys
+
+import numpy as np
+
+
+class AffineScaler:
+    # transform(x) = (x - shift) * scale. Centring before scaling keeps
+    # float32 exact enough for large-valued columns like pressure_msl, where
+    # x * scale + offset would cancel two numbers of ~200. inverse_transform(y)
+    # undoes it for the first y.shape[-1] columns, so model 2's 4 outputs can
+    # be de-scaled without padding a dummy city column back on.
+    def __init__(self, scale, shift, dtype=np.float32):
+        scale = np.asarray(scale, dtype=np.float64)
+        self.scale = scale.astype(dtype)
+        self.shift = np.asarray(shift, dtype=dtype)
+        self.inv_scale = (1.0 / scale).astype(dtype)
+
+    @classmethod
+    def from_sklearn(cls, scaler, dtype=np.float32):
+        # Duck-typed on the fitted attributes, so sklearn is only needed to
+        # unpickle the scaler, never to apply it
+        n = scaler.n_features_in_
+        if hasattr(scaler, 'min_'):
+            # MinMaxScaler: x * scale_ + min_ == (x + min_ / scale_) * scale_
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+            shift = -scaler.min_ / scale
+        else:
+            # StandardScaler: (x - mean_) / scale_; either may be disabled
+            std = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n)
+            shift = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n)
+            scale = 1.0 / np.asarray(std, dtype=np.float64)
+        return cls(scale, shift, dtype)
+
+    @property
+    def n_features(self):
+        return len(self.scale)
+
+    def transform(self, x, out=None):
+        out = np.subtract(x, self.shift, out=out, dtype=self.scale.dtype)
+        out *= self.scale
+        return out
+
+    def inverse_transform(self, y, out=None):
+        k = y.shape[-1]
+        out = np.multiply(y, self.inv_scale[:k], out=out, dtype=self.scale.dtype)
+        out += self.shift[:k]
+        return out
+
+
+def check_parity(scaler, rows=1000, seed=0):
+    # Max abs difference to sklearn for transform and for inverse_transform
+    # of the first 4 columns, on random rows around the fitted range
+    affine = AffineScaler.from_sklearn(scaler, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    lo = getattr(scaler, 'data_min_', None)
+    hi = getattr(scaler, 'data_max_', None)
+    if lo is None:
+        lo = scaler.mean_ - 3 * scaler.scale_
+        hi = scaler.mean_ + 3 * scaler.scale_
+    x = rng.uniform(lo, hi, size=(rows, affine.n_features))
+
+    forward = np.abs(affine.transform(x) - scaler.transform(x)).max()
+    scaled = scaler.transform(x)
+    inverse = np.abs(affine.inverse_transform(scaled[:, :4]) - scaler.inverse_transform(scaled)[:, :4]).max()
+    return forward, inverse
+
+
+if __name__ == "__main__":
+    import warnings
+
+    import joblib
+
+    from model_registry import MODEL_SPECS
+
+    warnings.filterwarnings("ignore")
+    paths = sys.argv[1:] or [spec[1] for spec in MODEL_SPECS.values()]
+    ok = True
+    for path in paths:
+        forward, inverse = check_parity(joblib.load(path))
+        ok &= forward < 1e-9 and inverse < 1e-9
+        print(f"{path}: transform max diff {forward:.2e}, inverse max diff {inverse:.2e}")
+    sys.exit(0 if ok else 1)
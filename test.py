@@ -3,10 +3,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from automate_forecast import run_forecast
+from forecast_store import ForecastStore
 
-# ⚡ Automatically run forecast to generate latest 5-day data
-run_forecast()
+# Forecasts are published by the scheduler (python automate_forecast.py --serve)
+forecast_store = ForecastStore()
 
 # Set page config
 st.set_page_config(
@@ -34,12 +34,10 @@ st.markdown("""
 st.markdown("<div class='title'>☁️ 5-Day Weather Forecast Dashboard</div>", unsafe_allow_html=True)
 
 # Load the prediction and weather data
-pred_df = pd.read_csv("forecast_weather_condition.csv")
-weather_df = pd.read_csv("forecast_weather_features.csv")
-
-# Convert time to datetime
-pred_df['time'] = pd.to_datetime(pred_df['time'])
-weather_df['time'] = pd.to_datetime(weather_df['time'])
+pred_df, weather_df = forecast_store.load_frames("Chennai")
+if pred_df is None:
+    st.warning("No forecast has been published yet. Start the scheduler with `python automate_forecast.py --serve`.")
+    st.stop()
 
 # Sidebar Filters
 st.sidebar.header("🔎 Filter Options")
@@ -120,8 +118,6 @@ with col2:
 
 # Refresh Button
 if st.sidebar.button("🔄 Refresh Forecast"):
-    run_forecast()
-    st.success("Forecast updated!")
     st.experimental_rerun()
 
 # Footer
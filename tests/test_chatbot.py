@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+import chatbot
+from benchmarks.completion_stub import REPLY, CompletionStub
+from forecast_cache import ForecastCache
+
+PROMPT = "Will it rain today?"
+SNAPSHOT = ("Chennai", "20260101T000000000000000", "2026-01-01 09:00:00")
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with CompletionStub(chunk_delay=0) as stub:
+        monkeypatch.setenv("OPENROUTER_API_KEY", "stub")
+        monkeypatch.setattr(chatbot, "OPENROUTER_URL", stub.url)
+        monkeypatch.setattr(chatbot, "response_cache", ForecastCache(cache_dir=None, ttl=60, name="chat_response"))
+        yield stub
+
+
+def test_stream_concatenates_to_full_answer(stub):
+    chunks = list(chatbot.stream_ai_response(PROMPT, "Time: 09:01 AM", SNAPSHOT))
+
+    assert len(chunks) > 1
+    # The stub echoes the message it got: weather context, then prompt
+    assert "".join(chunks) == REPLY.format(prompt=f"Time: 09:01 AM {PROMPT}")
+    assert stub.requests == 1
+
+
+def test_same_snapshot_is_served_from_cache(stub):
+    answer = "".join(chatbot.stream_ai_response(PROMPT, "Time: 09:01 AM", SNAPSHOT))
+    # A different clock in the context does not split the cache
+    cached = list(chatbot.stream_ai_response(PROMPT, "Time: 09:02 AM", SNAPSHOT))
+
+    assert cached == [answer]
+    assert stub.requests == 1
+
+
+def test_new_snapshot_misses_cache(stub):
+    list(chatbot.stream_ai_response(PROMPT, "Time: 09:01 AM", SNAPSHOT))
+    newer = SNAPSHOT[:1] + ("20260101T010000000000000",) + SNAPSHOT[2:]
+    chunks = list(chatbot.stream_ai_response(PROMPT, "Time: 10:01 AM", newer))
+
+    assert "".join(chunks) == REPLY.format(prompt=f"Time: 10:01 AM {PROMPT}")
+    assert stub.requests == 2
@@ -0,0 +1,53 @@
+import numpy as np
+
+import automate_forecast
+import forecast_cache
+from forecast_cache import ForecastCache
+from forecast_scheduler import ForecastScheduler
+from forecast_store import ForecastStore
+
+HOUR = 480000  # a fixed forecast hour, so the test never straddles one
+
+
+def _window():
+    times = np.datetime64(HOUR, 'h') + np.arange(120) * np.timedelta64(1, 'h')
+    values = np.tile(np.array([30.0, 70.0, 1010.0, 5.0], dtype=np.float32), (120, 1))
+    return times.astype('datetime64[s]'), values
+
+
+def _predict_windows(windows, engine="keras"):
+    return {
+        name: automate_forecast._result_frames(times, np.zeros((120, 3)), values.copy())
+        for name, (times, values) in windows.items()
+    }
+
+
+def test_unchanged_cycles_keep_store_version(tmp_path, monkeypatch):
+    store = ForecastStore(str(tmp_path / "store"))
+    monkeypatch.setattr(forecast_cache, "forecast_hour", lambda now=None: HOUR)
+    monkeypatch.setattr(automate_forecast, "forecast_cache", ForecastCache(cache_dir=None))
+    monkeypatch.setattr(automate_forecast, "forecast_store", store)
+    monkeypatch.setattr(automate_forecast, "fetch_weather_bulk", lambda coords: [_window() for _ in coords])
+    monkeypatch.setattr(automate_forecast, "predict_windows", _predict_windows)
+
+    scheduler = ForecastScheduler(["Chennai", "Delhi"], incremental=False, store=store)
+    scheduler.run_once()
+    first = {city: store.latest_version(city) for city in scheduler.cities}
+    scheduler.run_once()
+
+    assert all(first.values())
+    assert {city: store.latest_version(city) for city in scheduler.cities} == first
+    assert all(len(entry['versions']) == 1 for entry in store.read_index().values())
+
+
+def test_status_write_failure_keeps_scheduler_running(tmp_path, monkeypatch):
+    # A store root that is a file makes every status write fail
+    root = tmp_path / "store"
+    root.write_text("")
+    scheduler = ForecastScheduler(["Chennai"], incremental=False, store=ForecastStore(str(root)))
+    monkeypatch.setattr(scheduler, "_refresh_batch", lambda batch: {})
+
+    scheduler.run_once()
+    scheduler.run_once()
+
+    assert scheduler.cycles == 2
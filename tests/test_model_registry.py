@@ -0,0 +1,23 @@
+import os
+from types import SimpleNamespace
+
+from model_registry import ModelRegistry, file_hash
+
+
+def _fake_load(name, paths):
+    return SimpleNamespace(name=name, paths=paths, mtimes=tuple(os.stat(p).st_mtime_ns for p in paths),
+                           hashes=tuple(file_hash(p) for p in paths))
+
+
+def test_loaded_model_survives_deleted_file(tmp_path, monkeypatch):
+    for name in ("model.h5", "scaler.pkl"):
+        (tmp_path / name).write_bytes(b"weights")
+    registry = ModelRegistry(specs={"condition": ("model.h5", "scaler.pkl")}, base_dir=str(tmp_path),
+                             warmup=False, backend="numpy")
+    monkeypatch.setattr(registry, "_load", _fake_load)
+
+    entry = registry.get("condition")
+    os.remove(tmp_path / "model.h5")
+
+    assert registry.get("condition") is entry
+    assert registry.reloads == 0
@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import numpy_engine
+from model_registry import MODEL_SPECS
+from scaling import AffineScaler
+
+tf = pytest.importorskip("tensorflow")
+joblib = pytest.importorskip("joblib")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(ROOT, 'Model Training', '5_day_weather_features.csv')
+FIELDS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m']
+
+
+def _windows(scaler_path):
+    # The sample window once per city code, scaled the way serving scales it
+    values = pd.read_csv(SAMPLE_CSV)[FIELDS].to_numpy(dtype=np.float32)[:120]
+    X = np.empty((5, 120, 5), dtype=np.float32)
+    X[:, :, :4] = values
+    X[:, :, 4] = np.arange(5)[:, None]
+    return AffineScaler.from_sklearn(joblib.load(scaler_path)).transform(X)
+
+
+@pytest.mark.parametrize("name", sorted(MODEL_SPECS))
+def test_numpy_engine_matches_keras(name):
+    model_path, scaler_path = (os.path.join(ROOT, p) for p in MODEL_SPECS[name])
+    X = _windows(scaler_path)
+
+    expected = tf.keras.models.load_model(model_path).predict(X, verbose=0)
+    actual = numpy_engine.load_model(model_path).predict(X)
+
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pytest
+
+from model_registry import MODEL_SPECS
+from scaling import AffineScaler
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("name", sorted(MODEL_SPECS))
+def test_affine_scaler_matches_sklearn(name):
+    scaler = joblib.load(os.path.join(ROOT, MODEL_SPECS[name][1]))
+    affine = AffineScaler.from_sklearn(scaler, dtype=np.float64)
+    lo = getattr(scaler, 'data_min_', None)
+    hi = getattr(scaler, 'data_max_', None)
+    if lo is None:
+        lo, hi = scaler.mean_ - 3 * scaler.scale_, scaler.mean_ + 3 * scaler.scale_
+    x = np.random.default_rng(0).uniform(lo, hi, size=(240, affine.n_features))
+
+    scaled = scaler.transform(x)
+    assert np.allclose(affine.transform(x), scaled, rtol=0, atol=1e-9)
+
+    # Model 2 outputs only the first 4 columns; inverted in place
+    out = scaled[:, :4].copy()
+    result = affine.inverse_transform(out, out=out)
+    assert result is out
+    assert np.allclose(out, scaler.inverse_transform(scaled)[:, :4], rtol=0, atol=1e-9)
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from training import window_starts
+
+
+def _city_rows(city, hours):
+    return pd.DataFrame({'city': city, 'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(hours, unit='h')})
+
+
+def test_window_starts_skip_gaps_and_city_boundaries():
+    # City 0 is missing hours 10-12 (e.g. rows dropped by dropna); city 1 is
+    # complete
+    df = pd.concat([
+        _city_rows(0, np.r_[0:10, 13:40]),
+        _city_rows(1, np.arange(30)),
+    ], ignore_index=True)
+
+    starts = window_starts(df, window=8, horizon=4)
+
+    hours = ((df['time'] - pd.Timestamp('2024-01-01')) / pd.Timedelta(hours=1)).to_numpy()
+    for s in starts:
+        assert df['city'][s] == df['city'][s + 11]
+        assert hours[s + 11] - hours[s] == 11
+    # Windows entirely after city 0's gap and every window of city 1 remain
+    assert len(starts) == (37 - 10 - 12 + 1) + (30 - 12 + 1)
@@ -0,0 +1,78 @@
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+import utils
+from benchmarks.stub_server import StubServer
+
+COORDS = [(13.0827, 80.2707), (28.6139, 77.2090), (19.0760, 72.8777)]
+
+
+def _stub(fail=None):
+    # Open-Meteo stub whose handler logs every request and answers those
+    # matching fail(query, count) with the returned error status
+    stub = StubServer()
+    handler = stub.server.RequestHandlerClass
+
+    class Handler(handler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            requests.append(query)
+            status = fail(query, len(requests)) if fail else None
+            if status:
+                self.send_error(status)
+            else:
+                super().do_GET()
+
+    requests = []
+    stub.server.RequestHandlerClass = Handler
+    return stub, requests
+
+
+def _is_bulk(query):
+    return ',' in query['latitude'][0]
+
+
+def test_bulk_response_parsed_per_location():
+    stub, requests = _stub()
+    with stub:
+        results = utils.fetch_weather_bulk(COORDS, base_url=stub.url)
+
+    assert len(requests) == 1 and _is_bulk(requests[0])
+    assert len(results) == len(COORDS)
+    for times, values in results:
+        assert times.dtype == np.dtype('datetime64[s]') and len(times) == utils.WINDOW_HOURS
+        assert values.dtype == np.float32 and values.shape == (utils.WINDOW_HOURS, len(utils.MODEL_FIELDS))
+        assert times[0] == utils.current_hour()
+    # The stub offsets each location's values, so the order must be kept
+    assert np.allclose(results[1][1] - results[0][1], 0.01, atol=1e-3)
+
+
+def test_failed_bulk_request_falls_back_to_single_locations():
+    stub, requests = _stub(fail=lambda query, count: 400 if _is_bulk(query) else None)
+    with stub:
+        results = utils.fetch_weather_bulk(COORDS, base_url=stub.url)
+
+    assert sum(_is_bulk(q) for q in requests) == 1
+    assert sorted(float(q['latitude'][0]) for q in requests if not _is_bulk(q)) == sorted(c[0] for c in COORDS)
+    assert [len(times) for times, _ in results] == [utils.WINDOW_HOURS] * len(COORDS)
+
+
+def test_transient_server_error_is_retried():
+    stub, requests = _stub(fail=lambda query, count: 503 if count == 1 else None)
+    with stub:
+        times, values = utils.fetch_weather_arrays(*COORDS[0], base_url=stub.url)
+
+    assert len(requests) == 2
+    assert len(times) == utils.WINDOW_HOURS
+
+
+def test_persistent_server_error_raises_after_retries(monkeypatch):
+    monkeypatch.setattr(utils, "_session", None)
+    monkeypatch.setattr(utils, "BACKOFF_FACTOR", 0)
+    stub, requests = _stub(fail=lambda query, count: 503)
+    with stub, pytest.raises(utils.requests.exceptions.RequestException):
+        utils.fetch_weather_arrays(*COORDS[0], base_url=stub.url)
+
+    assert len(requests) == utils.MAX_RETRIES + 1
@@ -0,0 +1,23 @@
+import numpy as np
+
+import utils
+from window_buffer import IncrementalFetcher
+
+
+def _fake_get_json(params, base_url=None):
+    # Open-Meteo stand-in: every hour in the requested range, inclusive
+    times = np.arange(np.datetime64(params['start_hour'], 'h'), np.datetime64(params['end_hour'], 'h') + 1)
+    hourly = {'time': [str(t) for t in times]}
+    for i, field in enumerate(utils.HOURLY_FIELDS):
+        hourly[field] = [float(i)] * len(times)
+    return {'hourly': hourly}
+
+
+def test_full_and_incremental_windows_start_on_the_same_hour(monkeypatch):
+    monkeypatch.setattr(utils, "_get_json", _fake_get_json)
+
+    full_times, _ = utils.fetch_weather_arrays(13.0827, 80.2707)
+    incremental_times, _, _ = IncrementalFetcher(state_dir=None).refresh("Chennai", 13.0827, 80.2707)
+
+    assert len(full_times) == len(incremental_times) == utils.WINDOW_HOURS
+    assert full_times[0] == incremental_times[0] == utils.current_hour()
@@ -0,0 +1,240 @@
+# training.py
+#
+# Training pipeline for the two forecast models, replacing the notebook
+# create_sequences loops. Rows are scaled once; training windows are never
+# materialized up front. They are either zero-copy strided views
+# (window_view) or gathered per batch inside a tf.data pipeline
+# (make_dataset), so memory stays at O(rows) rather than O(rows * 120).
+#
+#   python training.py --data "Model Training/hourly_weather_data_labeled.csv" --model both
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m', 'city']
+TARGETS = FEATURES[:4]
+WINDOW = 120
+HORIZON = 120
+NUM_CLASSES = 3
+
+# Output artifacts, matching what automate_forecast loads
+ARTIFACTS = {
+    "condition": ("model_1_180_rain.h5", "model_1_180_rain.pkl"),
+    "features": ("model_2_temp_hum_press.h5", "model_2_scaler.pkl"),
+}
+
+
+def label_weather(codes):
+    # Vectorized label_weather from the notebook: 0 clear, 1 cloudy/fog, 2 rest
+    codes = np.asarray(codes)
+    return np.where(codes == 0, 0, np.where(np.isin(codes, [1, 2, 3, 45, 48]), 1, 2)).astype(np.int64)
+
+
+def load_dataset(path):
+    df = pd.read_csv(path)
+    df['time'] = pd.to_datetime(df['time'])
+    df = df.dropna(subset=FEATURES).sort_values(['city', 'time'], kind='stable').reset_index(drop=True)
+    if 'label' not in df:
+        df['label'] = label_weather(df['weathercode'])
+    return df
+
+
+def window_starts(df, window=WINDOW, horizon=HORIZON):
+    # Start rows of every (window + horizon) span that stays inside one city
+    # and covers consecutive hours; spans across rows dropped for missing
+    # values (or gaps in the archive) are skipped, as in backfill.py
+    span = window + horizon
+    hours = df['time'].to_numpy().astype('datetime64[h]').astype(np.int64)
+    starts = []
+    bounds = np.flatnonzero(np.diff(df['city'].to_numpy())) + 1
+    for begin, end in zip(np.r_[0, bounds], np.r_[bounds, len(df)]):
+        count = end - begin - span + 1
+        if count > 0:
+            city_starts = np.arange(begin, begin + count)
+            starts.append(city_starts[hours[city_starts + span - 1] - hours[city_starts] == span - 1])
+    return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+
+def window_view(rows, window=WINDOW):
+    # (n - window + 1, window, features) strided view; no data is copied
+    return np.lib.stride_tricks.sliding_window_view(rows, window, axis=0).transpose(0, 2, 1)
+
+
+def make_dataset(inputs, targets, starts, batch_size=32, shuffle=True, seed=42, window=WINDOW, horizon=HORIZON):
+    # tf.data pipeline over window start indices. Only the scaled rows live in
+    # memory (as one cached constant); each batch is gathered on the fly and
+    # prefetched while the previous batch trains.
+    import tensorflow as tf
+
+    inputs = tf.constant(inputs, dtype=tf.float32)
+    targets = tf.constant(targets)
+    input_offsets = tf.range(window, dtype=tf.int64)
+    target_offsets = tf.range(window, window + horizon, dtype=tf.int64)
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(
+        lambda s: (tf.gather(inputs, s[:, None] + input_offsets), tf.gather(targets, s[:, None] + target_offsets)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def build_condition_model():
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input, TimeDistributed
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+
+    model = Sequential([
+        Input((WINDOW, len(FEATURES))),
+        LSTM(128, return_sequences=True),
+        Dropout(0.5),
+        LSTM(128, return_sequences=True),
+        Dropout(0.5),
+        TimeDistributed(Dense(64, activation='relu')),
+        TimeDistributed(Dense(NUM_CLASSES, activation='softmax')),
+    ])
+    model.compile(optimizer=Adam(learning_rate=0.0001), loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def build_feature_model():
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input, TimeDistributed
+    from tensorflow.keras.losses import MeanSquaredError
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Input((WINDOW, len(FEATURES))),
+        LSTM(128, return_sequences=True),
+        Dropout(0.3),
+        LSTM(64, return_sequences=True),
+        Dropout(0.3),
+        TimeDistributed(Dense(64, activation='relu')),
+        TimeDistributed(Dense(len(TARGETS))),
+    ])
+    model.compile(optimizer='adam', loss=MeanSquaredError(), metrics=['mae'])
+    return model
+
+
+def covered_rows(starts, span, n_rows):
+    # Boolean mask of the rows inside any [start, start + span) window
+    coverage = np.zeros(n_rows + 1, dtype=np.int64)
+    np.add.at(coverage, starts, 1)
+    np.add.at(coverage, np.minimum(np.asarray(starts) + span, n_rows), -1)
+    return np.cumsum(coverage[:-1]) > 0
+
+
+def prepare(df, model_name, fit_starts=None):
+    # Scaled input rows, per-row targets and the fitted scaler. With
+    # fit_starts (the training windows), the scaler is fit only on the rows
+    # those windows read, so validation rows do not leak into its statistics:
+    # the input window for the condition model, input and target spans for
+    # the feature model, whose targets are scaled rows too.
+    from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+    rows = df[FEATURES]
+    if model_name == "condition":
+        scaler, span = StandardScaler(), WINDOW
+    else:
+        scaler, span = MinMaxScaler(), WINDOW + HORIZON
+    scaler.fit(rows if fit_starts is None else rows[covered_rows(fit_starts, span, len(rows))])
+    inputs = scaler.transform(rows).astype(np.float32)
+
+    if model_name == "condition":
+        targets = np.eye(NUM_CLASSES, dtype=np.float32)[df['label'].to_numpy()]
+    else:
+        targets = inputs[:, :len(TARGETS)]
+    return inputs, targets, scaler
+
+
+def split_starts(starts, test_size=0.2, seed=42):
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(starts)
+    n_test = int(len(shuffled) * test_size)
+    return shuffled[n_test:], shuffled[:n_test]
+
+
+def measure_throughput(ds, max_batches=200):
+    # Windows/sec the input pipeline alone can deliver
+    windows, start = 0, time.perf_counter()
+    for i, (x, _) in enumerate(ds):
+        windows += int(x.shape[0])
+        if i + 1 >= max_batches:
+            break
+    return windows / (time.perf_counter() - start)
+
+
+def _throughput_callback(train_windows):
+    import tensorflow as tf
+
+    class WindowThroughput(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            rate = train_windows / (time.perf_counter() - self._start)
+            print(f"Epoch {epoch + 1}: {rate:,.0f} windows/sec")
+            if logs is not None:
+                logs['windows_per_sec'] = rate
+
+    return WindowThroughput()
+
+
+def train(df, model_name, out_dir='.', epochs=20, batch_size=32, seed=42):
+    import joblib
+    import tensorflow as tf
+    tf.random.set_seed(seed)
+
+    train_starts, val_starts = split_starts(window_starts(df), seed=seed)
+    inputs, targets, scaler = prepare(df, model_name, fit_starts=train_starts)
+    print(f"{model_name}: {len(train_starts):,} train / {len(val_starts):,} val windows from {len(df):,} rows")
+
+    train_ds = make_dataset(inputs, targets, train_starts, batch_size, seed=seed)
+    val_ds = make_dataset(inputs, targets, val_starts, batch_size, shuffle=False)
+    print(f"Input pipeline: {measure_throughput(train_ds):,.0f} windows/sec")
+
+    model = build_condition_model() if model_name == "condition" else build_feature_model()
+    history = model.fit(train_ds, validation_data=val_ds, epochs=epochs,
+                        callbacks=[_throughput_callback(len(train_starts))])
+
+    model_file, scaler_file = ARTIFACTS[model_name]
+    os.makedirs(out_dir, exist_ok=True)
+    model.save(os.path.join(out_dir, model_file))
+    joblib.dump(scaler, os.path.join(out_dir, scaler_file))
+    print(f"Saved {model_file} and {scaler_file} to {out_dir}")
+    return model, scaler, history
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the weather condition and feature models.")
+    parser.add_argument("--data", default="hourly_weather_data_labeled.csv",
+                        help="Hourly CSV with the columns of hourly_weather_data_labeled.csv")
+    parser.add_argument("--model", choices=["condition", "features", "both"], default="both")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--benchmark", action="store_true", help="Only report input pipeline windows/sec")
+    args = parser.parse_args()
+
+    data = load_dataset(args.data)
+    names = ["condition", "features"] if args.model == "both" else [args.model]
+    for name in names:
+        if args.benchmark:
+            x, y, _ = prepare(data, name)
+            ds = make_dataset(x, y, window_starts(data), args.batch_size)
+            print(f"{name}: {measure_throughput(ds):,.0f} windows/sec")
+        else:
+            train(data, name, args.out_dir, args.epochs, args.batch_size)
+
+    # Keep the serving bundle in step with the artifacts just written
+    artifacts = [os.path.join(args.out_dir, f) for files in ARTIFACTS.values() for f in files]
+    if not args.benchmark and all(os.path.exists(p) for p in artifacts):
+        from model_bundle import DEFAULT_PATH, export_bundle
+        digest = export_bundle(os.path.join(args.out_dir, DEFAULT_PATH), specs=ARTIFACTS, base_dir=args.out_dir)
+        print(f"Exported {DEFAULT_PATH} (content hash {digest[:16]})")
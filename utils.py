@@ -1,24 +1,132 @@
 # utils.py
 
-import requests
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+# Point OPEN_METEO_URL at a local stub server to run without the network
+OPEN_METEO_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+HOURLY_FIELDS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'windspeed_10m', 'weathercode']
+MODEL_FIELDS = HOURLY_FIELDS[:4]
+WINDOW_HOURS = 120
+
+# HTTP settings
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s between retries
+POOL_SIZE = 16
+BULK_CHUNK_SIZE = 50  # Coordinates per bulk request, keeps URLs short
+MAX_WORKERS = 8  # Concurrent single-location requests in the fallback path
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled session per process; retries cover connection errors and
+    # transient 429/5xx responses with exponential backoff
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def current_hour():
+    # Start of the current UTC hour, where every forecast window begins
+    return np.datetime64(int(time.time() // 3600), 'h').astype('datetime64[s]')
+
+
+def _params(lats, lons, start_hour=None, end_hour=None):
+    # Exact hour range (inclusive). Full fetches cover the WINDOW_HOURS hours
+    # from the current hour, the same window incremental refreshes keep.
+    if start_hour is None:
+        start_hour = current_hour()
+        end_hour = start_hour + np.timedelta64(WINDOW_HOURS - 1, 'h')
+    return {
+        'latitude': ','.join(str(lat) for lat in lats),
+        'longitude': ','.join(str(lon) for lon in lons),
+        'hourly': ','.join(HOURLY_FIELDS),
+        'timezone': 'UTC',
+        'start_hour': str(np.datetime64(start_hour, 'm')),
+        'end_hour': str(np.datetime64(end_hour, 'm')),
+    }
+
+
+def _get_json(params, base_url=None):
+    with metrics.timer("open_meteo_request"):
+        response = get_session().get(base_url or OPEN_METEO_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+
+def parse_hourly(hourly, hours=WINDOW_HOURS):
+    # Open-Meteo's hourly block -> (times, values): the first `hours` steps
+    # as datetime64 and a float32 (hours, 4) array in MODEL_FIELDS order
+    times = np.asarray(hourly['time'], dtype='datetime64[s]')
+    order = np.argsort(times, kind='stable')[:hours]
+    values = np.column_stack([np.asarray(hourly[field], dtype=np.float32)[order] for field in MODEL_FIELDS])
+    return times[order], values
+
+
+def fetch_weather_arrays(lat, lon, base_url=None):
+    data = _get_json(_params([lat], [lon]), base_url)
+    return parse_hourly(data['hourly'])
+
+
+def fetch_weather_range(lat, lon, start_hour, end_hour, base_url=None):
+    # Every hour from start_hour to end_hour inclusive, untruncated
+    data = _get_json(_params([lat], [lon], start_hour, end_hour), base_url)
+    return parse_hourly(data['hourly'], hours=None)
 
-def fetch_weather_data(lat, lon):
-    start_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-    end_time = start_time + timedelta(hours=120)
 
-    url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={lat}&longitude={lon}&hourly=temperature_2m,relative_humidity_2m,"
-        f"pressure_msl,windspeed_10m,weathercode&timezone=UTC"
-        f"&start_date={start_time.date()}&end_date={end_time.date()}"
-    )
+def fetch_weather_bulk(coords, base_url=None):
+    # coords is a list of (lat, lon). Open-Meteo takes comma-separated
+    # coordinates, so each chunk is one request; if a bulk request fails the
+    # chunk falls back to concurrent single-location requests.
+    coords = list(coords)
+    results = [None] * len(coords)
+    for start in range(0, len(coords), BULK_CHUNK_SIZE):
+        chunk = coords[start:start + BULK_CHUNK_SIZE]
+        try:
+            data = _get_json(_params([c[0] for c in chunk], [c[1] for c in chunk]), base_url)
+            if isinstance(data, dict):
+                data = [data]
+            if len(data) != len(chunk):
+                raise ValueError(f"Expected {len(chunk)} locations, got {len(data)}")
+            parsed = [parse_hourly(item['hourly']) for item in data]
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"Bulk fetch failed ({e}), falling back to per-location requests...")
+            metrics.count("errors_total", stage="fetch_bulk", error=type(e).__name__)
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunk))) as pool:
+                parsed = list(pool.map(lambda c: fetch_weather_arrays(c[0], c[1], base_url), chunk))
+        results[start:start + len(chunk)] = parsed
+    return results
 
-    response = requests.get(url)
-    data = response.json()
 
-    df = pd.DataFrame(data['hourly'])
-    df['time'] = pd.to_datetime(df['time'])
-    df = df.sort_values('time').head(120).reset_index(drop=True)
+def fetch_weather_data(lat, lon, base_url=None):
+    with metrics.timer("fetch_weather_data"):
+        times, values = fetch_weather_arrays(lat, lon, base_url)
+        with metrics.timer("frame_build"):
+            df = pd.DataFrame(values, columns=MODEL_FIELDS)
+            df.insert(0, 'time', pd.DatetimeIndex(times))
     return df
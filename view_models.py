@@ -0,0 +1,152 @@
+# view_models.py
+#
+# Everything app.py renders for one forecast version, computed once: the
+# conditions and features joined on time, split by day, the hourly box HTML
+# per day and an hour -> row lookup for the "current weather" card.
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+WEATHER_EMOJI = {'Sunny': '☀️', 'Cloudy': '☁️', 'Rainy': '🌧️', 'Clear': '☀️'}
+
+BOX_TEMPLATE = """<div class='hour-box-vertical'>
+                <h4>{hour}</h4>
+                <div class='weather-info'>
+                    {emoji} {condition}<br>
+                    🌡️ Temp: {temperature:.1f}°C<br>
+                    💧 Hum: {humidity:.0f}%<br>
+                    🧭 Press: {pressure:.0f} hPa
+                </div>
+            </div>"""
+
+
+class DayView:
+    def __init__(self, pred, weather, boxes_html):
+        self.pred = pred
+        self.weather = weather
+        self.boxes_html = boxes_html
+
+
+class ForecastView:
+    def __init__(self, city, version, joined, days, hour_index):
+        self.city = city
+        self.version = version
+        self.joined = joined
+        self.days = days
+        self.hour_index = hour_index
+
+    @property
+    def day_options(self):
+        return list(self.days)
+
+    def day(self, day):
+        return self.days.get(day)
+
+    def current_row(self, timestamp):
+        # Row for the given hour as a dict, or None if it is outside the window
+        i = self.hour_index.get(pd.Timestamp(timestamp))
+        return None if i is None else self.joined.iloc[i].to_dict()
+
+
+def _boxes_html(day):
+    # Plain zip over column arrays instead of iterrows + per-row filtering
+    return ''.join(
+        BOX_TEMPLATE.format(
+            hour=t.strftime('%I:%M %p'),
+            emoji=WEATHER_EMOJI.get(condition, '❓'),
+            condition=condition,
+            temperature=temperature,
+            humidity=humidity,
+            pressure=pressure,
+        )
+        for t, condition, temperature, humidity, pressure in zip(
+            day['time'], day['Predicted_Weather'], day['temperature_2m'],
+            day['relative_humidity_2m'], day['pressure_msl'],
+        )
+    )
+
+
+def build_forecast_view(city, version, pred_df, weather_df):
+    # One hash join on time instead of a filter per hour
+    joined = pred_df.merge(weather_df, on='time', how='inner').sort_values('time', ignore_index=True)
+
+    # Rows are sorted, so each day is one contiguous slice
+    dates = joined['time'].dt.date.to_numpy()
+    unique_days, starts = np.unique(dates, return_index=True)
+    bounds = list(starts) + [len(joined)]
+
+    days = {}
+    for day, start, stop in zip(unique_days, bounds[:-1], bounds[1:]):
+        rows = joined.iloc[start:stop]
+        days[day] = DayView(
+            pred=rows[['time', 'Predicted_Weather']],
+            weather=rows.drop(columns='Predicted_Weather'),
+            boxes_html=_boxes_html(rows),
+        )
+
+    hour_index = {t: i for i, t in enumerate(joined['time'])}
+    return ForecastView(city, version, joined, days, hour_index)
+
+
+class ForecastViewCache:
+    # Latest ForecastView per city, shared by every session in the process.
+    # Concurrent requests for the same (city, version) wait for one build.
+    # Invalidation is per city: a newer version replaces only that city's
+    # view, and on_new_version(city, version) lets dependent caches (the
+    # figure cache) drop the same city's stale entries. get() returns None
+    # for a version that has since been pruned from the store.
+    def __init__(self, store, on_new_version=None):
+        self.store = store
+        self.on_new_version = on_new_version
+        self._views = {}  # city -> ForecastView
+        self._building = {}  # (city, version) -> lock held by the builder
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'builds': 0, 'invalidations': 0}
+
+    def _cached(self, city, version):
+        view = self._views.get(city)
+        if view is not None and view.version == version:
+            self.counters['hits'] += 1
+            return view
+        return None
+
+    def get(self, city, version):
+        with self._lock:
+            view = self._cached(city, version)
+            if view is not None:
+                return view
+            build_lock = self._building.setdefault((city, version), threading.Lock())
+
+        try:
+            with build_lock:
+                with self._lock:
+                    view = self._cached(city, version)
+                if view is not None:
+                    return view
+
+                try:
+                    pred_df, weather_df = self.store.load_frames(city, version)
+                except FileNotFoundError:
+                    pred_df = weather_df = None
+                if pred_df is None:
+                    # Pruned by newer publishes since the caller read the index
+                    return None
+                view = build_forecast_view(city, version, pred_df, weather_df)
+                with self._lock:
+                    self.counters['builds'] += 1
+                    current = self._views.get(city)
+                    # Version names sort by publish time; a session still on an
+                    # older version gets its view without evicting the newer one
+                    replaced = current is None or current.version < version
+                    if replaced:
+                        self._views[city] = view
+                        if current is not None:
+                            self.counters['invalidations'] += 1
+        finally:
+            with self._lock:
+                self._building.pop((city, version), None)
+        if replaced and self.on_new_version is not None:
+            self.on_new_version(city, version)
+        return view
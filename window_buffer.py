@@ -0,0 +1,139 @@
+# window_buffer.py
+
+import hashlib
+import os
+
+import numpy as np
+
+from utils import WINDOW_HOURS, current_hour, fetch_weather_range
+
+ONE_HOUR = np.timedelta64(1, 'h')
+
+
+class WindowBuffer:
+    # Fixed-size ring buffer holding one city's latest hourly window. New
+    # hours overwrite the oldest slots in place; window() returns them in
+    # time order.
+    def __init__(self, times, values):
+        self.times = np.array(times, dtype='datetime64[s]')
+        self.values = np.array(values, dtype=np.float32)
+        self.head = 0  # slot holding the oldest hour
+
+    @property
+    def size(self):
+        return len(self.times)
+
+    @property
+    def first_time(self):
+        return self.times[self.head]
+
+    @property
+    def last_time(self):
+        return self.times[(self.head - 1) % self.size]
+
+    def push(self, times, values):
+        slots = (self.head + np.arange(len(times))) % self.size
+        self.times[slots] = times
+        self.values[slots] = values
+        self.head = (self.head + len(times)) % self.size
+
+    def window(self):
+        order = (self.head + np.arange(self.size)) % self.size
+        return self.times[order], self.values[order]
+
+    def digest(self):
+        times, values = self.window()
+        return hashlib.sha1(times.tobytes() + values.tobytes()).hexdigest()
+
+    def save(self, path):
+        times, values = self.window()
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, times=times, values=values)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['times'], data['values'])
+
+
+def _is_contiguous(times, start, hours):
+    expected = start + np.arange(hours) * ONE_HOUR
+    return len(times) == hours and np.array_equal(times, expected)
+
+
+class IncrementalFetcher:
+    # Keeps the last window per city and, on refresh, requests only the hours
+    # that appeared since the previous run. Anything unexpected (a jump
+    # larger than the window, missing or out-of-order hours, NaNs) falls back
+    # to a full fetch. Buffers persist in state_dir so hourly cron runs in
+    # fresh processes stay incremental.
+    def __init__(self, state_dir='window_state', hours=WINDOW_HOURS, base_url=None):
+        self.state_dir = state_dir
+        self.hours = hours
+        self.base_url = base_url
+        self.buffers = {}
+        self.digests = {}
+        self.counters = {'full_fetches': 0, 'incremental_fetches': 0, 'up_to_date': 0, 'hours_fetched': 0}
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, f"{name}.npz")
+
+    def _buffer(self, name):
+        buf = self.buffers.get(name)
+        if buf is None and self.state_dir and os.path.exists(self._path(name)):
+            try:
+                buf = WindowBuffer.load(self._path(name))
+            except (OSError, ValueError, KeyError):
+                buf = None
+            if buf is not None and buf.size == self.hours:
+                self.buffers[name] = buf
+                self.digests[name] = buf.digest()
+            else:
+                buf = None
+        return buf
+
+    def _full_fetch(self, lat, lon, start):
+        times, values = fetch_weather_range(lat, lon, start, start + (self.hours - 1) * ONE_HOUR, self.base_url)
+        self.counters['full_fetches'] += 1
+        self.counters['hours_fetched'] += len(times)
+        if not _is_contiguous(times, start, self.hours) or np.isnan(values).any():
+            raise ValueError(f"Incomplete weather window starting {start}")
+        return WindowBuffer(times, values)
+
+    def _incremental_fetch(self, buf, lat, lon, start):
+        shift = int((start - buf.first_time) // ONE_HOUR)
+        if shift == 0:
+            self.counters['up_to_date'] += 1
+            return True
+        if shift < 0 or shift >= self.hours:
+            return False
+
+        first_missing = buf.last_time + ONE_HOUR
+        times, values = fetch_weather_range(lat, lon, first_missing, first_missing + (shift - 1) * ONE_HOUR,
+                                            self.base_url)
+        self.counters['incremental_fetches'] += 1
+        self.counters['hours_fetched'] += len(times)
+        if not _is_contiguous(times, first_missing, shift) or np.isnan(values).any():
+            print(f"Gap in incremental data after {buf.last_time}, doing a full fetch...")
+            return False
+        buf.push(times, values)
+        return True
+
+    def refresh(self, name, lat, lon):
+        # Returns (times, values, changed) for the window starting this hour
+        start = current_hour()
+        buf = self._buffer(name)
+        if buf is None or not self._incremental_fetch(buf, lat, lon, start):
+            buf = self._full_fetch(lat, lon, start)
+            self.buffers[name] = buf
+
+        digest = buf.digest()
+        changed = digest != self.digests.get(name)
+        self.digests[name] = digest
+        if changed and self.state_dir:
+            os.makedirs(self.state_dir, exist_ok=True)
+            buf.save(self._path(name))
+
+        times, values = buf.window()
+        return times, values, changed